@@ -2,15 +2,41 @@
 Betting Game Simulation
 
 This module simulates a betting game with configurable parameters and analyzes
-the outcomes across multiple simulations. It uses a dynamic betting strategy
-that switches from aggressive to conservative betting after a certain number of games.
+the outcomes across multiple simulations. By default it uses a dynamic betting
+strategy that switches from aggressive to conservative betting after a certain
+number of games; other strategies can be plugged in through Strategy.
 """
 
-import random
+import copy
+import functools
+import hashlib
+from abc import ABC, abstractmethod
+from collections import deque
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import pickle
 import statistics
-from dataclasses import dataclass
-from typing import List, Tuple
-import matplotlib.pyplot as plt
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+# Bump whenever a change alters the results produced for a given config and seed
+ENGINE_VERSION = 4
+
+ENGINES = ("scalar", "vectorized", "jit", "log")
+RESULT_DTYPES = ("float64", "float32")
+PLOT_FORMATS = ("png", "svg", "pdf")
+
+SeedLike = Optional[Union[int, np.random.SeedSequence, np.random.Generator]]
+
+# GameConfig fields that may vary within a parameter sweep
+SWEEP_PARAMETERS = ("initial_stake", "win_chance", "bet_percent",
+                    "payout_ratio", "strategy_switch_point")
 
 
 @dataclass
@@ -24,6 +50,20 @@ class GameConfig:
     payout_ratio: int = 2
     strategy_switch_point: int = 33  # Games remaining to switch to conservative betting
     num_simulations: int = 5000
+    # "scalar" (one path at a time), "vectorized" (NumPy batch), "jit" (numba)
+    # or "log" (log-stake sums for very long horizons, run with run_log_simulations)
+    engine: str = "vectorized"
+    # Number of processes to spread the simulations across; once the jit engine
+    # has run in this process, workers are spawned rather than forked, so such
+    # scripts need an `if __name__ == "__main__":` guard
+    workers: int = 1
+    chunk_size: int = 100_000  # Paths per chunk; each chunk has its own random stream
+    result_dtype: str = "float64"  # Storage for final stakes; "float32" halves memory
+    compact_fraction: float = 0.25  # Drop busted paths from the batch once they are this share of it
+    antithetic: bool = False  # Pair path 2k (uniform u) with path 2k+1 (uniform 1 - u)
+    # Win chance to simulate under for importance sampling; paths are then
+    # reweighted by their likelihood ratio (see run_importance_sampling)
+    tilted_win_chance: Optional[float] = None
 
     def validate(self) -> None:
         """Validate configuration parameters."""
@@ -39,43 +79,292 @@ class GameConfig:
             raise ValueError("Total games must be positive")
         if self.num_simulations <= 0:
             raise ValueError("Number of simulations must be positive")
+        if self.engine not in ENGINES:
+            raise ValueError(f"Engine must be one of {ENGINES}")
+        if self.workers <= 0:
+            raise ValueError("Number of workers must be positive")
+        if self.chunk_size <= 0:
+            raise ValueError("Chunk size must be positive")
+        if self.result_dtype not in RESULT_DTYPES:
+            raise ValueError(f"Result dtype must be one of {RESULT_DTYPES}")
+        if not 0 < self.compact_fraction <= 1:
+            raise ValueError("Compact fraction must be between 0 and 1")
+        if self.antithetic and self.engine != "vectorized":
+            raise ValueError("Antithetic pairs need the vectorized engine")
+        if self.antithetic and self.chunk_size % 2:
+            raise ValueError("Chunk size must be even so antithetic pairs stay within a chunk")
+        if self.tilted_win_chance is not None:
+            if not 0 < self.tilted_win_chance < 1:
+                raise ValueError("Tilted win chance must be between 0 and 1")
+            if self.engine != "vectorized":
+                raise ValueError("Importance sampling needs the vectorized engine")
+
+
+class Strategy(ABC):
+    """
+    Betting strategy used by BettingSimulator.
+
+    Every strategy provides a scalar bet for the one-path engine and a batched
+    bet_array for the vectorized engine. Path-dependent strategies keep their
+    per-path state in the value returned by initial_state and advanced by
+    next_state; stateless strategies ignore the state argument.
+    """
+
+    @abstractmethod
+    def bet(self, stake: float, remaining: int, state: Any = None) -> float:
+        """
+        Calculate the bet for one path.
+
+        Args:
+            stake: Current available stake
+            remaining: Number of games remaining, including this one
+            state: Per-path state from initial_state/next_state
+
+        Returns:
+            The bet amount for this game
+        """
+
+    @abstractmethod
+    def bet_array(self, stakes: np.ndarray, remaining: int, state: Any = None) -> np.ndarray:
+        """
+        Calculate the bets for a batch of paths at the same game.
+
+        Args:
+            stakes: Current available stake of each path
+            remaining: Number of games remaining, including this one
+            state: Per-path state array from initial_state/next_state
+
+        Returns:
+            Array of bet amounts
+        """
+
+    def fraction(self, remaining: int) -> Optional[float]:
+        """
+        Get the share of the stake bet with this many games remaining.
+
+        Returns:
+            The fraction, or None if the bet is not proportional to the stake
+        """
+        return None
+
+    def initial_state(self, num_paths: Optional[int] = None) -> Any:
+        """
+        Create the starting state for one path (num_paths None) or a batch.
+
+        Returns:
+            State value or array, or None for stateless strategies
+        """
+        return None
+
+    def next_state(self, state: Any, wins: Union[bool, np.ndarray]) -> Any:
+        """
+        Advance the state after a game.
+
+        Args:
+            state: State before the game
+            wins: Whether the game was won, per path for a batch
+
+        Returns:
+            State for the next game
+        """
+        return state
+
+
+@dataclass(frozen=True)
+class HybridStrategy(Strategy):
+    """Spread the stake over the remaining games, then bet a fixed percentage near the end."""
+
+    strategy_switch_point: int  # Games remaining to switch to conservative betting
+    bet_percent: float
+
+    @classmethod
+    def from_config(cls, config: GameConfig) -> "HybridStrategy":
+        """Build the strategy described by a GameConfig."""
+        return cls(config.strategy_switch_point, config.bet_percent)
+
+    def bet(self, stake: float, remaining: int, state: Any = None) -> float:
+        if remaining > self.strategy_switch_point:
+            # Aggressive strategy: divide stake evenly across remaining games
+            return stake / remaining
+        else:
+            # Conservative strategy: bet a fixed percentage
+            return stake * self.bet_percent
+
+    def bet_array(self, stakes: np.ndarray, remaining: int, state: Any = None) -> np.ndarray:
+        # Every path in a batch is at the same game, so one branch covers them all
+        if remaining > self.strategy_switch_point:
+            return stakes / remaining
+        return stakes * self.bet_percent
+
+    def fraction(self, remaining: int) -> Optional[float]:
+        return 1 / remaining if remaining > self.strategy_switch_point else self.bet_percent
+
+
+@dataclass(frozen=True)
+class FixedFractionStrategy(Strategy):
+    """Bet the same share of the current stake every game."""
+
+    bet_percent: float
+
+    def bet(self, stake: float, remaining: int, state: Any = None) -> float:
+        return stake * self.bet_percent
+
+    def bet_array(self, stakes: np.ndarray, remaining: int, state: Any = None) -> np.ndarray:
+        return stakes * self.bet_percent
+
+    def fraction(self, remaining: int) -> Optional[float]:
+        return self.bet_percent
+
+
+@dataclass(frozen=True)
+class KellyStrategy(Strategy):
+    """Bet the (optionally scaled) Kelly fraction of the stake; nothing without an edge."""
+
+    win_chance: float
+    payout_ratio: int
+    kelly_multiplier: float = 1.0  # e.g. 0.5 for half Kelly
+
+    @classmethod
+    def from_config(cls, config: GameConfig, kelly_multiplier: float = 1.0) -> "KellyStrategy":
+        """Build a Kelly strategy for the odds in a GameConfig."""
+        return cls(config.win_chance, config.payout_ratio, kelly_multiplier)
+
+    @property
+    def kelly_fraction(self) -> float:
+        """Growth-optimal share of the stake, clipped to [0, 1]."""
+        net_odds = self.payout_ratio - 1
+        if net_odds <= 0:
+            return 0.0
+        optimal = self.win_chance - (1 - self.win_chance) / net_odds
+        return min(max(optimal * self.kelly_multiplier, 0.0), 1.0)
+
+    def bet(self, stake: float, remaining: int, state: Any = None) -> float:
+        return stake * self.kelly_fraction
+
+    def bet_array(self, stakes: np.ndarray, remaining: int, state: Any = None) -> np.ndarray:
+        return stakes * self.kelly_fraction
+
+    def fraction(self, remaining: int) -> Optional[float]:
+        return self.kelly_fraction
+
+
+@dataclass(frozen=True)
+class MartingaleStrategy(Strategy):
+    """Double the bet after every loss and return to the base bet after a win."""
+
+    base_bet: float
+
+    def bet(self, stake: float, remaining: int, state: Any = None) -> float:
+        return min(state, stake)
+
+    def bet_array(self, stakes: np.ndarray, remaining: int, state: Any = None) -> np.ndarray:
+        return np.minimum(state, stakes)
+
+    def initial_state(self, num_paths: Optional[int] = None) -> Any:
+        # State is the bet the martingale wants to place next
+        if num_paths is None:
+            return self.base_bet
+        return np.full(num_paths, self.base_bet)
+
+    def next_state(self, state: Any, wins: Union[bool, np.ndarray]) -> Any:
+        if np.ndim(wins) == 0:
+            return self.base_bet if wins else 2 * state
+        return np.where(wins, self.base_bet, 2 * state)
 
 
 class BettingSimulator:
     """Simulates betting games with configurable strategies."""
 
-    def __init__(self, config: GameConfig):
+    def __init__(self, config: GameConfig, seed: SeedLike = None,
+                 cache: Optional["ResultCache"] = None,
+                 strategy: Optional[Strategy] = None):
         """
         Initialize the betting simulator.
 
         Args:
             config: Game configuration parameters
+            seed: Integer seed, SeedSequence or Generator for the random streams
+                (fresh OS entropy if None)
+            cache: Result cache to reuse earlier runs from; only seeded runs
+                are cached
+            strategy: Betting strategy (the config's hybrid strategy if None)
         """
         config.validate()
         self.config = config
+        self.strategy = strategy if strategy is not None else HybridStrategy.from_config(config)
+        self.multipliers = multiplier_tables(self.strategy, config.total_games, config.payout_ratio)
+        self.seed_sequence = make_seed_sequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.cache = cache if seed is not None else None
+
+    @property
+    def num_chunks(self) -> int:
+        """Number of chunks the simulations are split into."""
+        return -(-self.config.num_simulations // self.config.chunk_size)
+
+    def chunk_rng(self, chunk_index: int) -> np.random.Generator:
+        """
+        Get the independent random stream for one chunk.
+
+        Chunk streams are children of this simulator's seed sequence keyed by
+        chunk index, so they do not depend on how chunks are assigned to
+        processes or machines.
+
+        Args:
+            chunk_index: Index of the chunk
+
+        Returns:
+            Generator for the chunk
+        """
+        child = np.random.SeedSequence(
+            self.seed_sequence.entropy,
+            spawn_key=self.seed_sequence.spawn_key + (chunk_index,),
+        )
+        return np.random.default_rng(child)
 
-    def run_one_simulation(self) -> float:
+    def run_one_simulation(self, rng: Optional[np.random.Generator] = None) -> float:
         """
         Simulate one complete game series.
 
+        Args:
+            rng: Random stream to draw from (the simulator's own stream if None)
+
         Returns:
             The final stake after all games (0.0 if bankrupt)
         """
+        rng = rng if rng is not None else self.rng
+        draws = rng.random(self.config.total_games).tolist()
         current_stake = self.config.initial_stake
 
+        if self.multipliers is not None:
+            # Stake-proportional strategy: each game is one table lookup
+            win_multipliers, loss_multipliers = (table.tolist() for table in self.multipliers)
+            for game in range(self.config.total_games):
+                if draws[game] < self.config.win_chance:
+                    current_stake *= win_multipliers[game]
+                else:
+                    current_stake *= loss_multipliers[game]
+                if current_stake <= 0:
+                    return 0.0
+            return current_stake
+
+        state = self.strategy.initial_state()
+
         for game in range(self.config.total_games):
             remaining_games = self.config.total_games - game
 
             # Determine bet amount based on strategy
-            bet_amount = self._calculate_bet(current_stake, remaining_games)
+            bet_amount = self.strategy.bet(current_stake, remaining_games, state)
 
             # Play the game
-            if random.random() < self.config.win_chance:
+            won = draws[game] < self.config.win_chance
+            if won:
                 # Win: get back the bet plus winnings
                 current_stake += bet_amount * (self.config.payout_ratio - 1)
             else:
                 # Lose: lose the bet amount
                 current_stake -= bet_amount
+            state = self.strategy.next_state(state, won)
 
             # Check for bankruptcy
             if current_stake <= 0:
@@ -83,150 +372,2451 @@ class BettingSimulator:
 
         return current_stake
 
-    def _calculate_bet(self, current_stake: float, remaining_games: int) -> float:
+    def simulate_batch(self, num_paths: int, rng: Optional[np.random.Generator] = None,
+                       return_win_counts: bool = False, return_weights: bool = False
+                       ) -> Union[np.ndarray, Tuple[np.ndarray, ...]]:
         """
-        Calculate the bet amount based on the current strategy.
+        Simulate many game series at once, advancing every path one game per step.
+
+        Produces the same distribution as repeated calls to run_one_simulation,
+        but each game is a handful of array operations instead of a Python loop
+        over paths. Bankrupt paths stay frozen at zero in the batch until they
+        make up config.compact_fraction of it; the batch is then compacted to
+        the live paths only, so per-game cost tracks the number of live paths.
+
+        With antithetic pairs or win counts, uniforms are still drawn for every
+        path and game, so pairs stay aligned and every win count covers all
+        games (making its expectation exactly total_games * win_chance).
+
+        With config.tilted_win_chance, games are won with the tilted chance
+        and each path carries the likelihood ratio of its games under the real
+        and the tilted chance. A path's weight is frozen when it goes bust,
+        since its outcome no longer depends on the games that follow.
 
         Args:
-            current_stake: Current available stake
-            remaining_games: Number of games remaining
+            num_paths: Number of independent game series to simulate
+            rng: Random stream to draw from (the simulator's own stream if None)
+            return_win_counts: Also return each path's number of won games
+            return_weights: Also return each path's likelihood-ratio weight
+                (required for tilted configs, all ones otherwise)
 
         Returns:
-            The bet amount for this game
+            Array of final stakes (0.0 for bankrupt paths), followed by the
+            arrays of win counts and weights if requested
         """
-        if remaining_games > self.config.strategy_switch_point:
-            # Aggressive strategy: divide stake evenly across remaining games
-            return current_stake / remaining_games
-        else:
-            # Conservative strategy: bet a fixed percentage
-            return current_stake * self.config.bet_percent
+        tilted = self.config.tilted_win_chance
+        if tilted is not None and not return_weights:
+            raise ValueError("Tilted runs are biased without their weights; "
+                             "use run_importance_sampling")
+
+        rng = rng if rng is not None else self.rng
+        draw_chance = tilted if tilted is not None else self.config.win_chance
+        draw_all = self.config.antithetic or return_win_counts
+        win_counts = np.zeros(num_paths, dtype=np.int64) if return_win_counts else None
+        if return_weights:
+            # Log-likelihood ratio per path, for live paths and frozen at bankruptcy
+            final_log_weights = np.zeros(num_paths)
+            log_weights = np.zeros(num_paths)
+            log_win_ratio = math.log(self.config.win_chance / draw_chance)
+            log_loss_ratio = math.log((1 - self.config.win_chance) / (1 - draw_chance))
+        stakes = np.full(num_paths, self.config.initial_stake, dtype=np.float64)
+        live_paths = np.arange(num_paths)  # Original index of each batch entry
+        state = self.strategy.initial_state(num_paths)
+        bankrupt = np.zeros(num_paths, dtype=bool)
+        bust_count = 0
+        win_multiplier = self.config.payout_ratio - 1
+        if self.multipliers is not None:
+            # Row g holds (loss factor, win factor), indexed by the win flag
+            factor_table = np.stack([self.multipliers[1], self.multipliers[0]], axis=1)
+            # Scratch buffers reused every game, sliced to the live batch; other
+            # strategies get fresh win flags, since next_state may keep them
+            uniforms = np.empty(num_paths)
+            win_flags = np.empty(num_paths, dtype=bool)
+            factors = np.empty(num_paths)
+
+        for game in range(self.config.total_games):
+            remaining_games = self.config.total_games - game
+            live_count = len(stakes)
+
+            if draw_all:
+                all_wins = self._draw_uniforms(num_paths, rng) < draw_chance
+                if win_counts is not None:
+                    win_counts += all_wins
+                wins = all_wins if live_count == num_paths else all_wins[live_paths]
+            elif self.multipliers is not None:
+                draws = rng.random(out=uniforms[:live_count])
+                wins = np.less(draws, draw_chance, out=win_flags[:live_count])
+            else:
+                wins = rng.random(live_count) < draw_chance
+
+            if return_weights and tilted is not None:
+                log_weights += np.where(bankrupt, 0.0, np.where(wins, log_win_ratio, log_loss_ratio))
+
+            if self.multipliers is not None:
+                # Stake-proportional strategy: branch-free multiply by the game's factor
+                stakes *= factor_table[game].take(wins.view(np.uint8), out=factors[:live_count],
+                                                  mode="clip")
+                if self.multipliers[1][game] > 0:
+                    continue  # A positive loss factor cannot bust anyone
+            else:
+                # Win: gain the bet times the net payout; lose: forfeit the bet
+                bet_amounts = self.strategy.bet_array(stakes, remaining_games, state)
+                stakes += np.where(wins, bet_amounts * win_multiplier, -bet_amounts)
+                state = self.strategy.next_state(state, wins)
+
+            # Bankrupt paths are frozen at zero for the rest of the series
+            new_busts = (stakes <= 0) & ~bankrupt
+            new_bust_count = int(np.count_nonzero(new_busts))
+            if new_bust_count == 0:
+                continue
+            bankrupt |= new_busts
+            stakes[bankrupt] = 0.0
+            bust_count += new_bust_count
+
+            if bust_count - (num_paths - len(stakes)) >= self.config.compact_fraction * len(stakes):
+                live = ~bankrupt
+                if return_weights:
+                    final_log_weights[live_paths[bankrupt]] = log_weights[bankrupt]
+                    log_weights = log_weights[live]
+                stakes, live_paths, bankrupt = stakes[live], live_paths[live], bankrupt[live]
+                if state is not None:
+                    state = state[live]
+                if len(stakes) == 0 and not draw_all:
+                    break
+
+        final_stakes = np.zeros(num_paths, dtype=np.float64)
+        final_stakes[live_paths] = stakes
+        extras = []
+        if return_win_counts:
+            extras.append(win_counts)
+        if return_weights:
+            final_log_weights[live_paths] = log_weights
+            extras.append(np.exp(final_log_weights))
+        if extras:
+            return (final_stakes, *extras)
+        return final_stakes
+
+    def _draw_uniforms(self, num_paths: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Draw one uniform per path, as antithetic pairs if configured.
+
+        Args:
+            num_paths: Number of paths
+            rng: Random stream to draw from
+
+        Returns:
+            Array of uniforms; with antithetic pairs, entry 2k + 1 is 1 - entry 2k
+        """
+        if not self.config.antithetic:
+            return rng.random(num_paths)
+
+        base = rng.random((num_paths + 1) // 2)
+        uniforms = np.empty(num_paths)
+        uniforms[0::2] = base
+        uniforms[1::2] = 1 - base[:num_paths // 2]
+        return uniforms
+
+    def simulate_log_batch(self, num_paths: int,
+                           rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        Simulate many game series as sums of log stake multipliers.
+
+        The final log-stake of a path is the sum over games of the log win or
+        loss multiplier, so blocks of games are one vectorized row sum and the
+        stake itself can never overflow or underflow, even over 10^5-10^6
+        games. A zero loss multiplier contributes -inf, so bankruptcy is the
+        log-stake threshold -inf. Requires a stake-proportional strategy.
+
+        Args:
+            num_paths: Number of independent game series to simulate
+            rng: Random stream to draw from (the simulator's own stream if None)
+
+        Returns:
+            Array of final log-stakes (-inf for bankrupt paths)
+        """
+        if self.multipliers is None:
+            raise ValueError("The log engine needs a stake-proportional strategy")
+
+        rng = rng if rng is not None else self.rng
+        with np.errstate(divide="ignore"):
+            log_wins, log_losses = (np.log(table) for table in self.multipliers)
+
+        total_games = self.config.total_games
+        log_stakes = np.full(num_paths, math.log(self.config.initial_stake))
+        block = max(1, (4 << 20) // (8 * num_paths))  # Games per block, ~4 MB of draws
+
+        for start in range(0, total_games, block):
+            stop = min(start + block, total_games)
+            wins = rng.random((num_paths, stop - start)) < self.config.win_chance
+            log_stakes += np.where(wins, log_wins[start:stop], log_losses[start:stop]).sum(axis=1)
+
+        return log_stakes
+
+    def simulate_log_chunk(self, chunk_index: int) -> np.ndarray:
+        """
+        Simulate one chunk of paths with the log engine.
+
+        Args:
+            chunk_index: Index of the chunk, from 0 to num_chunks - 1
 
-    def run_simulations(self) -> List[float]:
+        Returns:
+            Array of final log-stakes for the chunk (-inf for bankrupt paths)
+        """
+        if not 0 <= chunk_index < self.num_chunks:
+            raise ValueError(f"Chunk index must be between 0 and {self.num_chunks - 1}")
+
+        start = chunk_index * self.config.chunk_size
+        num_paths = min(self.config.chunk_size, self.config.num_simulations - start)
+        return self.simulate_log_batch(num_paths, self.chunk_rng(chunk_index))
+
+    def simulate_chunk(self, chunk_index: int, return_win_counts: bool = False,
+                       return_weights: bool = False
+                       ) -> Union[np.ndarray, Tuple[np.ndarray, ...]]:
+        """
+        Simulate one chunk of paths with the configured engine.
+
+        The result depends only on the seed, the config and the chunk index, so
+        chunks can be computed in any order, in any process or on any machine
+        and concatenated to reproduce a serial run bit for bit.
+
+        Args:
+            chunk_index: Index of the chunk, from 0 to num_chunks - 1
+            return_win_counts: Also return win counts (vectorized engine only)
+            return_weights: Also return likelihood-ratio weights (vectorized
+                engine only)
+
+        Returns:
+            Array of final stakes for the chunk, followed by win counts and
+            weights if requested
+        """
+        if not 0 <= chunk_index < self.num_chunks:
+            raise ValueError(f"Chunk index must be between 0 and {self.num_chunks - 1}")
+
+        start = chunk_index * self.config.chunk_size
+        num_paths = min(self.config.chunk_size, self.config.num_simulations - start)
+        rng = self.chunk_rng(chunk_index)
+
+        if self.config.engine == "vectorized":
+            return self.simulate_batch(num_paths, rng, return_win_counts, return_weights)
+        if return_win_counts or return_weights:
+            raise ValueError("Win counts and weights need the vectorized engine")
+
+        if self.config.engine == "log":
+            # Stakes over long horizons underflow to zero and would pass for busts
+            raise ValueError("The log engine keeps log-stakes; use run_log_simulations")
+
+        if self.config.engine == "jit" and _jit_kernels() is not None:
+            kernel_parameters = self._jit_parameters()
+            if kernel_parameters is not None:
+                return self._simulate_jit(num_paths, rng, *kernel_parameters)
+            warnings.warn(f"The jit kernel cannot express {self.strategy!r}; "
+                          "falling back to the much slower scalar engine", RuntimeWarning)
+
+        # Scalar engine, also used by "jit" without numba or for strategies the
+        # kernel cannot express; it draws the same uniforms as the kernel
+        final_stakes = np.empty(num_paths, dtype=np.float64)
+        for i in range(num_paths):
+            final_stakes[i] = self.run_one_simulation(rng)
+        return final_stakes
+
+    def _jit_parameters(self) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+        """
+        Describe the strategy in terms the compiled kernel understands.
+
+        Returns:
+            Tuple of (win multipliers, loss multipliers, martingale base bet),
+            or None if the strategy is neither stake-proportional nor a martingale
+        """
+        if self.multipliers is not None:
+            return self.multipliers[0], self.multipliers[1], 0.0
+        if isinstance(self.strategy, MartingaleStrategy):
+            unused = np.ones(self.config.total_games)
+            return unused, unused, self.strategy.base_bet
+        return None
+
+    def _simulate_jit(self, num_paths: int, rng: np.random.Generator,
+                      win_multipliers: np.ndarray, loss_multipliers: np.ndarray,
+                      martingale_base: float) -> np.ndarray:
+        """
+        Simulate paths with the numba-compiled per-path game loop.
+
+        Uniforms are drawn path by path in the same order as the scalar engine,
+        in blocks that keep the draw matrix to a few megabytes.
+
+        Args:
+            num_paths: Number of game series to simulate
+            rng: Random stream to draw from
+            win_multipliers: Stake factor per game on a win (ignored for a martingale)
+            loss_multipliers: Stake factor per game on a loss (ignored for a martingale)
+            martingale_base: Martingale base bet, or 0.0 for proportional betting
+
+        Returns:
+            Array of final stakes
+        """
+        global _parallel_kernel_used
+        game_loop = _jit_kernels()[0]
+        _parallel_kernel_used = True
+        total_games = self.config.total_games
+        block = max(1, (4 << 20) // (8 * total_games))
+        final_stakes = np.empty(num_paths, dtype=np.float64)
+
+        for start in range(0, num_paths, block):
+            count = min(block, num_paths - start)
+            game_loop(rng.random((count, total_games)), self.config.initial_stake,
+                           self.config.win_chance, float(self.config.payout_ratio - 1),
+                           win_multipliers, loss_multipliers, martingale_base,
+                           final_stakes[start:start + count])
+        return final_stakes
+
+    def run_simulations(self, return_win_counts: bool = False,
+                        quantize: Optional[float] = None
+                        ) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray], "QuantizedResults"]:
         """
         Run multiple simulations and collect results.
 
+        Results are written chunk by chunk into one preallocated array of
+        config.result_dtype, using 8 or 4 bytes per simulation.
+
+        Args:
+            return_win_counts: Also return each path's number of won games, the
+                control variate for SimulationAnalyzer (vectorized engine only)
+            quantize: If given, compress the results chunk by chunk into
+                distinct values and counts, at this relative precision (0 for
+                exact distinct values)
+
         Returns:
-            List of final stakes from all simulations
+            Array of final stakes from all simulations, plus the array of win
+            counts if requested; compressed results if quantize is given
         """
+        if quantize is not None:
+            if return_win_counts:
+                raise ValueError("Win counts cannot be kept with quantized results")
+            return self._run_quantized(quantize)
+        if return_win_counts:
+            return self._run_with_win_counts()
+
+        cache_key = self._cache_key("results")
+        if cache_key is not None and cache_key in self.cache:
+            print(f"Loaded {self.config.num_simulations} simulations from cache.")
+            return self.cache.get(cache_key)
+
         print(f"Running {self.config.num_simulations} simulations...")
 
-        final_stakes = []
-        for _ in range(self.config.num_simulations):
-            final_stake = self.run_one_simulation()
-            final_stakes.append(final_stake)
+        final_stakes = np.empty(self.config.num_simulations, dtype=self.config.result_dtype)
+        start = 0
+        for chunk in self.iter_batches():
+            final_stakes[start:start + len(chunk)] = chunk
+            start += len(chunk)
 
         print("Simulations complete.")
+        if cache_key is not None:
+            self.cache.put(cache_key, final_stakes)
         return final_stakes
 
+    def _run_quantized(self, relative_precision: float) -> "QuantizedResults":
+        """Run all chunks, compressing each into distinct values and counts."""
+        if not 0 <= relative_precision < 1:
+            raise ValueError("Relative precision must be between 0 and 1")
 
-class SimulationAnalyzer:
-    """Analyzes and reports on simulation results."""
+        cache_key = self._cache_key(f"quantized:{relative_precision!r}")
+        if cache_key is not None and cache_key in self.cache:
+            print(f"Loaded {self.config.num_simulations} simulations from cache.")
+            return self.cache.get(cache_key)
 
-    def __init__(self, config: GameConfig, final_stakes: List[float]):
+        print(f"Running {self.config.num_simulations} simulations...")
+
+        results = QuantizedResults(np.empty(0), np.empty(0, dtype=np.int64), relative_precision)
+        worker = functools.partial(_quantize_chunk, relative_precision=relative_precision)
+        for chunk_results in self._map_chunks(worker):
+            results = results.merge(chunk_results)
+
+        print(f"Simulations complete ({len(results.values)} distinct values).")
+        if cache_key is not None:
+            self.cache.put(cache_key, results)
+        return results
+
+    def _run_with_win_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Run all chunks, collecting final stakes and win counts (uncached)."""
+        return self._collect_chunks(_simulate_chunk_with_wins, np.int64)
+
+    def run_importance_sampling(self) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Initialize the analyzer.
+        Run simulations under config.tilted_win_chance, with likelihood-ratio weights.
+
+        Rare outcomes become common under a suitable tilt (a lower win chance
+        for bust probabilities), and reweighting each path by the ratio of its
+        probability under the real and the tilted win chance keeps the weighted
+        mean and bust rate unbiased (SimulationAnalyzer divides weighted sums by
+        the number of paths; weighted quantiles are self-normalized). Pass both
+        arrays to SimulationAnalyzer.
+
+        Returns:
+            Tuple of (final stakes, weights)
+        """
+        if self.config.tilted_win_chance is None:
+            raise ValueError("Importance sampling needs a tilted win chance in the config")
+        return self._collect_chunks(_simulate_chunk_weighted, np.float64)
+
+    def _collect_chunks(self, worker: Callable,
+                        extra_dtype: np.dtype) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run all chunks with a worker returning (final stakes, per-path extra) pairs.
 
         Args:
-            config: Game configuration used for simulations
-            final_stakes: Results from all simulations
+            worker: Chunk worker, as for _map_chunks
+            extra_dtype: Data type of the per-path extra values
+
+        Returns:
+            Tuple of (final stakes, extra values) for all simulations
         """
-        self.config = config
-        self.final_stakes = final_stakes
+        print(f"Running {self.config.num_simulations} simulations...")
 
-    def calculate_statistics(self) -> Tuple[float, float, float, int]:
+        final_stakes = np.empty(self.config.num_simulations, dtype=self.config.result_dtype)
+        extras = np.empty(self.config.num_simulations, dtype=extra_dtype)
+        start = 0
+        for chunk, chunk_extras in self._map_chunks(worker):
+            final_stakes[start:start + len(chunk)] = chunk
+            extras[start:start + len(chunk)] = chunk_extras
+            start += len(chunk)
+
+        print("Simulations complete.")
+        return final_stakes, extras
+
+    def run_log_simulations(self) -> np.ndarray:
         """
-        Calculate key statistics from simulation results.
+        Run multiple simulations with the log engine, keeping log-stakes.
+
+        Use this instead of run_simulations when final stakes would overflow or
+        underflow float64. The config's engine setting is ignored.
 
         Returns:
-            Tuple of (average, median, bust_rate_percent, bust_count)
+            Array of final log-stakes from all simulations (-inf for bankrupt paths)
         """
-        average = statistics.mean(self.final_stakes)
-        median = statistics.median(self.final_stakes)
-        bust_count = sum(1 for stake in self.final_stakes if stake == 0.0)
-        bust_rate = (bust_count / len(self.final_stakes)) * 100
+        cache_key = self._cache_key("log_results")
+        if cache_key is not None and cache_key in self.cache:
+            print(f"Loaded {self.config.num_simulations} simulations from cache.")
+            return self.cache.get(cache_key)
 
-        return average, median, bust_rate, bust_count
+        print(f"Running {self.config.num_simulations} simulations (log space)...")
 
-    def print_results(self) -> None:
-        """Print detailed simulation results to console."""
-        average, median, bust_rate, _ = self.calculate_statistics()
+        log_stakes = np.empty(self.config.num_simulations, dtype=self.config.result_dtype)
+        start = 0
+        for chunk in self._map_chunks(_simulate_log_chunk):
+            log_stakes[start:start + len(chunk)] = chunk
+            start += len(chunk)
 
-        print("\n" + "=" * 50)
-        print("STRATEGY RESULTS")
-        print("=" * 50)
-        print(f"Initial Stake:              ${self.config.initial_stake:.2f}")
-        print(f"Games per Simulation:       {self.config.total_games}")
-        print(f"Win Chance:                 {self.config.win_chance * 100}%")
-        print(f"Conservative Bet Percent:   {self.config.bet_percent * 100}%")
-        print(f"Payout Ratio:               {self.config.payout_ratio}:1")
-        print(f"Strategy Switch Point:      {self.config.strategy_switch_point} games")
-        print("-" * 50)
-        print(f"Average Final Stake:        ${average:,.2f}")
-        print(f"Median Final Stake:         ${median:,.2f}")
-        print(f"Bankruptcy Rate:            {bust_rate:.2f}%")
-        print("=" * 50)
+        print("Simulations complete.")
+        if cache_key is not None:
+            self.cache.put(cache_key, log_stakes)
+        return log_stakes
 
-    def plot_histogram(self, display_percentile: float = 0.95) -> None:
+    def run_summary(self, histogram: Optional["StakeHistogram"] = None) -> "StreamingStatistics":
         """
-        Create a histogram of the simulation results.
+        Run multiple simulations, keeping only streaming summary statistics.
+
+        Each chunk of results is folded into a StreamingStatistics accumulator
+        and discarded, so memory stays bounded by the chunk size no matter how
+        many simulations are run.
 
         Args:
-            display_percentile: Percentile to use for x-axis range (default 0.95)
+            histogram: Bins to accumulate the final stakes into as chunks
+                complete, for SimulationAnalyzer.plot_histogram (only the
+                edges are used; the summary carries its own filled copy)
+
+        Returns:
+            Summary of all final stakes
         """
-        # Filter out bankruptcies for cleaner visualization
-        winning_stakes = [stake for stake in self.final_stakes if stake > 0]
+        kind = "summary"
+        if histogram is not None:
+            kind += ":" + hashlib.sha256(histogram.edges.tobytes()).hexdigest()
+        cache_key = self._cache_key(kind)
+        if cache_key is not None and cache_key in self.cache:
+            print(f"Loaded summary of {self.config.num_simulations} simulations from cache.")
+            return self.cache.get(cache_key)
 
-        if not winning_stakes:
-            print("\nCannot plot histogram: all simulations went bust.")
-            return
+        print(f"Running {self.config.num_simulations} simulations (streaming)...")
 
-        print(f"\nGenerating histogram (showing {display_percentile * 100}% of results)...")
+        summary = StreamingStatistics(histogram=histogram)
+        worker = functools.partial(_summarize_chunk, histogram=histogram)
+        for chunk_summary in self._map_chunks(worker):
+            summary.merge(chunk_summary)
 
-        # Calculate display range
-        winning_stakes_sorted = sorted(winning_stakes)
-        percentile_index = int(len(winning_stakes_sorted) * display_percentile)
-        max_range = winning_stakes_sorted[percentile_index]
+        print("Simulations complete.")
+        if cache_key is not None:
+            self.cache.put(cache_key, summary)
+        return summary
 
-        # Calculate statistics for display
-        average, median, bust_rate, _ = self.calculate_statistics()
+    def _cache_key(self, kind: str) -> Optional[str]:
+        """Cache key for this simulator's results of the given kind, or None if uncached."""
+        if self.cache is None:
+            return None
+        rng_algorithm = type(self.rng.bit_generator).__name__
+        return ResultCache.make_key(self.config, self.seed_sequence, kind, rng_algorithm,
+                                    self.strategy)
 
-        # Create the histogram
-        plt.figure(figsize=(12, 7))
-        plt.hist(winning_stakes, bins=100, range=(0, max_range),
-                 edgecolor='black', alpha=0.7)
+    def run_adaptive(self, mean_relative_halfwidth: Optional[float] = None,
+                     bust_rate_halfwidth: Optional[float] = None,
+                     confidence: float = 0.95, max_simulations: Optional[int] = None,
+                     batch_size: int = 1000) -> "AdaptiveResult":
+        """
+        Run batches of simulations until the requested precision is reached.
 
-        plt.title(f"Distribution of Final Stakes ({self.config.num_simulations} simulations, excluding bankruptcies)",
-                  fontsize=14, fontweight='bold')
-        plt.xlabel("Final Stake ($)", fontsize=12)
-        plt.ylabel("Frequency", fontsize=12)
+        After every batch the confidence intervals of the mean final stake and
+        of the bust rate are recomputed from a streaming summary; the run stops
+        as soon as every given target is met or the budget is exhausted.
 
-        # Add summary statistics box
-        summary_text = (
-            f"Simulations: {self.config.num_simulations:,}\n"
-            f"Display Range: {display_percentile * 100}%\n"
-            f"Games per Simulation: {self.config.total_games}\n"
-            f"Win Chance: {self.config.win_chance * 100}%\n"
-            f"Conservative Bet: {self.config.bet_percent * 100}%\n"
-            f"Payout Ratio: {self.config.payout_ratio}:1\n"
-            f"Strategy Switch: {self.config.strategy_switch_point} games\n"
-            f"{'─' * 25}\n"
-            f"Initial Stake: ${self.config.initial_stake:.0f}\n"
-            f"Bankruptcy Rate: {bust_rate:.1f}%\n"
-            f"Median: ${median:,.0f}\n"
-            f"Average: ${average:,.0f}"
-        )
+        Args:
+            mean_relative_halfwidth: Target half-width of the mean's interval,
+                relative to the mean (e.g. 0.01 for +/-1%)
+            bust_rate_halfwidth: Target absolute half-width of the bust rate's
+                interval, as a fraction (e.g. 0.001 for +/-0.1 points)
+            confidence: Confidence level of the intervals
+            max_simulations: Simulation budget (config.num_simulations if None)
+            batch_size: Simulations between precision checks
+
+        Returns:
+            Summary, achieved intervals and whether the targets were met
+        """
+        if mean_relative_halfwidth is None and bust_rate_halfwidth is None:
+            raise ValueError("At least one precision target is required")
+        if not 0 < confidence < 1:
+            raise ValueError("Confidence must be between 0 and 1")
 
-        plt.text(0.98, 0.98, summary_text,
-                transform=plt.gca().transAxes,
-                verticalalignment='top',
-                horizontalalignment='right',
-                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8),
-                fontfamily='monospace',
-                fontsize=9)
-
-        plt.grid(axis='y', alpha=0.3, linestyle='--')
-        plt.tight_layout()
-        plt.show()
+        budget = max_simulations if max_simulations is not None else self.config.num_simulations
+        simulator = copy.copy(self)
+        simulator.config = replace(self.config, num_simulations=budget)
+        simulator.config.validate()
+
+        print(f"Running up to {budget} simulations until the target precision is reached...")
+
+        summary = StreamingStatistics()
+        converged = False
+        for batch in simulator.iter_batches(batch_size):
+            summary.update(batch)
+            converged = summary.count > 1 and _precision_met(
+                summary, confidence, mean_relative_halfwidth, bust_rate_halfwidth)
+            if converged:
+                break
+
+        result = AdaptiveResult(summary, confidence, summary.mean_interval(confidence),
+                                summary.bust_rate_interval(confidence), converged)
+        status = "Target precision reached" if converged else "Budget exhausted"
+        print(f"{status} after {summary.count} simulations.")
+        return result
+
+    def run_to_file(self, path: str) -> "ResultFile":
+        """
+        Run multiple simulations, writing final stakes chunk by chunk to disk.
+
+        The results go into a memory-mapped file, so runs far larger than
+        physical memory are possible. The file header records the config and
+        the seed, so the run can be reproduced or analyzed later with
+        SimulationAnalyzer.from_file.
+
+        Args:
+            path: Output file path
+
+        Returns:
+            The written result file
+        """
+        print(f"Running {self.config.num_simulations} simulations into {path}...")
+
+        result_file = ResultFile.create(path, self.config, self.seed_sequence, self.strategy)
+        start = 0
+        for chunk in self.iter_batches():
+            result_file.stakes[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        result_file.stakes.flush()
+
+        print("Simulations complete.")
+        return result_file
+
+    def iter_batches(self, batch_size: Optional[int] = None,
+                     progress: Optional[Callable[[int, int], None]] = None) -> Iterator[np.ndarray]:
+        """
+        Generate final stakes batch by batch as they are simulated.
+
+        Only a bounded number of batches is in memory or in flight at once, so
+        consumers can aggregate, display or write results as they arrive and
+        stop early (for example once their statistics converge). Batches are
+        chunks with their own random streams, so with batch_size equal to
+        config.chunk_size the concatenated batches equal run_simulations.
+
+        Args:
+            batch_size: Paths per batch (config.chunk_size if None)
+            progress: Called as progress(completed, total) after each batch
+
+        Returns:
+            Iterator over arrays of final stakes, in batch order
+        """
+        simulator = self
+        if batch_size is not None and batch_size != self.config.chunk_size:
+            simulator = copy.copy(self)
+            simulator.config = replace(self.config, chunk_size=batch_size)
+            simulator.config.validate()
+
+        completed = 0
+        for batch in simulator._map_chunks(_simulate_chunk):
+            completed += len(batch)
+            if progress is not None:
+                progress(completed, self.config.num_simulations)
+            yield batch
+
+    def _map_chunks(self, worker: Callable) -> Iterator:
+        """
+        Apply a chunk worker to every chunk, in a process pool if configured.
+
+        At most two chunks per worker are submitted ahead of the consumer, and
+        any still pending are cancelled if the consumer stops early. Once this
+        process has run the parallel numba kernel, workers are spawned rather
+        than forked: such a fork inherits the kernel's threading layer and
+        hangs at exit. Otherwise the platform's default start method is used.
+
+        Args:
+            worker: Module-level function taking (simulator, chunk_index)
+
+        Returns:
+            Iterator over the worker results, in chunk order
+        """
+        num_chunks = self.num_chunks
+
+        if self.config.workers == 1:
+            for chunk_index in range(num_chunks):
+                yield worker(self, chunk_index)
+            return
+
+        chunk_indices = iter(range(num_chunks))
+        context = multiprocessing.get_context("spawn") if _parallel_kernel_used else None
+        with ProcessPoolExecutor(max_workers=self.config.workers, mp_context=context) as pool:
+            pending = deque(pool.submit(worker, self, chunk_index)
+                            for chunk_index in itertools.islice(chunk_indices, 2 * self.config.workers))
+            try:
+                while pending:
+                    result = pending.popleft().result()
+                    next_index = next(chunk_indices, None)
+                    if next_index is not None:
+                        pending.append(pool.submit(worker, self, next_index))
+                    yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def exact_distribution(self, grid_size: int = 4096) -> "ExactDistribution":
+        """
+        Compute the final-stake distribution without Monte Carlo.
+
+        Requires a stake-proportional strategy, so that every game multiplies
+        the stake by a factor that depends only on the remaining games and the
+        outcome. The trailing run of games sharing one bet fraction (the
+        conservative phase of the hybrid strategy) is binomial in the number of
+        wins. The games before it are built by dynamic programming over a
+        uniform log-stake grid: each game shifts the probability mass by the
+        log of its win or loss factor, and mass landing between two grid points
+        is split so that the expected stake is preserved. Cost is
+        O(total_games * grid_size) and independent of num_simulations.
+
+        Args:
+            grid_size: Number of log-stake grid points for the aggressive phase
+
+        Returns:
+            Distribution of final stakes, including the bust probability
+        """
+        if grid_size < 2:
+            raise ValueError("Grid size must be at least 2")
+
+        if self.multipliers is None:
+            raise ValueError("The exact engine needs a stake-proportional strategy")
+
+        config = self.config
+        p = config.win_chance
+        win_table, loss_table = (table.tolist() for table in self.multipliers)
+
+        conservative_games = 1
+        while (conservative_games < config.total_games
+               and win_table[-conservative_games - 1] == win_table[-1]
+               and loss_table[-conservative_games - 1] == loss_table[-1]):
+            conservative_games += 1
+
+        # Stake multipliers per aggressive game; a zero loss factor means bust
+        win_factors = win_table[:-conservative_games]
+        loss_factors = loss_table[:-conservative_games]
+        log_wins = [math.log(f) for f in win_factors]
+        log_losses = [math.log(f) if f > 0 else None for f in loss_factors]
+
+        low = sum(x for x in log_losses if x is not None)
+        high = sum(log_wins)
+        if high - low > 0:
+            grid = np.linspace(low, high, grid_size)
+            mass = _shift_mass(_point_mass(grid_size), grid, -low)
+        else:
+            grid = np.zeros(1)
+            mass = np.ones(1)
+        bust_probability = 0.0
+
+        for log_win, log_loss in zip(log_wins, log_losses):
+            stepped = p * _shift_mass(mass, grid, log_win)
+            if log_loss is None:
+                bust_probability += (1 - p) * mass.sum()
+            else:
+                stepped += (1 - p) * _shift_mass(mass, grid, log_loss)
+            mass = stepped
+
+        # Conservative phase: only the number of wins matters
+        log_conservative, conservative_probs = _binomial_log_factors(
+            conservative_games, p, win_table[-1], loss_table[-1])
+        if loss_table[-1] <= 0:
+            # Any conservative loss is a bust; only the all-wins outcome survives
+            bust_probability += mass.sum() * -math.expm1(conservative_games * math.log(p))
+
+        values = config.initial_stake * np.exp(grid[:, None] + log_conservative[None, :]).ravel()
+        probabilities = (mass[:, None] * conservative_probs[None, :]).ravel()
+        keep = probabilities > 0
+        values, probabilities = values[keep], probabilities[keep]
+
+        if bust_probability > 0:
+            values = np.append(values, 0.0)
+            probabilities = np.append(probabilities, bust_probability)
+
+        order = np.argsort(values, kind="stable")
+        return ExactDistribution(values[order], probabilities[order], bust_probability)
+
+
+@dataclass
+class ExactDistribution:
+    """Discrete distribution of final stakes produced by the exact engine."""
+
+    values: np.ndarray  # Sorted final stakes (0.0 for bankruptcy)
+    probabilities: np.ndarray  # Probability of each value; sums to 1
+    bust_probability: float = 0.0
+
+    def mean(self) -> float:
+        """Expected final stake."""
+        return float(np.dot(self.values, self.probabilities))
+
+    def quantile(self, q: float) -> float:
+        """
+        Get the smallest final stake whose cumulative probability reaches q.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Final stake at quantile q
+        """
+        cumulative = np.cumsum(self.probabilities)
+        index = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(self.values[min(index, len(self.values) - 1)])
+
+
+@dataclass
+class QuantizedResults:
+    """
+    Final stakes compressed to distinct values with their counts.
+
+    With a positive relative precision, positive stakes are first rounded to
+    the centre of logarithmic buckets, so every stored value is within that
+    relative error of the stakes it stands for. Means and quantiles computed
+    from the compressed form then carry at most the same relative error, while
+    memory and quantile queries scale with the number of distinct values.
+    """
+
+    values: np.ndarray  # Sorted distinct final stakes (0.0 for bankruptcy)
+    counts: np.ndarray  # Number of simulations at each value
+    relative_precision: float = 0.0  # Maximum relative error of a value (0 for exact)
+
+    @property
+    def num_simulations(self) -> int:
+        """Number of simulations represented."""
+        return int(self.counts.sum())
+
+    @classmethod
+    def from_stakes(cls, stakes: np.ndarray,
+                    relative_precision: float = 0.0) -> "QuantizedResults":
+        """
+        Compress an array of final stakes.
+
+        Args:
+            stakes: Final stakes
+            relative_precision: Maximum relative error of a stored value, e.g.
+                5e-5 for about 4 significant digits (0 keeps values exact)
+
+        Returns:
+            Compressed results
+        """
+        if not 0 <= relative_precision < 1:
+            raise ValueError("Relative precision must be between 0 and 1")
+
+        stakes = np.asarray(stakes, dtype=np.float64)
+        if relative_precision > 0:
+            # Buckets of log-width h; their centres are within exp(h / 2) - 1 of any member
+            step = 2 * math.log1p(relative_precision)
+            positive = stakes > 0
+            quantized = np.zeros_like(stakes)
+            quantized[positive] = np.exp((np.floor(np.log(stakes[positive]) / step) + 0.5) * step)
+            stakes = quantized
+
+        values, counts = np.unique(stakes, return_counts=True)
+        return cls(values, counts.astype(np.int64), relative_precision)
+
+    def merge(self, other: "QuantizedResults") -> "QuantizedResults":
+        """
+        Combine with results compressed at the same precision.
+
+        Args:
+            other: Results to combine with
+
+        Returns:
+            Compressed results of both
+        """
+        if other.relative_precision != self.relative_precision:
+            raise ValueError("Only results of the same precision can be merged")
+
+        values, inverse = np.unique(np.concatenate([self.values, other.values]),
+                                    return_inverse=True)
+        counts = np.zeros(len(values), dtype=np.int64)
+        np.add.at(counts, inverse, np.concatenate([self.counts, other.counts]))
+        return QuantizedResults(values, counts, self.relative_precision)
+
+
+def _point_mass(grid_size: int) -> np.ndarray:
+    """Unit mass on the first grid point."""
+    mass = np.zeros(grid_size)
+    mass[0] = 1.0
+    return mass
+
+
+def _shift_mass(mass: np.ndarray, grid: np.ndarray, offset: float) -> np.ndarray:
+    """
+    Move probability mass on a uniform log-stake grid by a log-factor.
+
+    Mass landing between two grid points is split between them linearly in
+    stake (not log-stake) space, which keeps the expected stake exact. Mass
+    pushed past either end of the grid piles up on the edge point.
+
+    Args:
+        mass: Probability mass per grid point
+        grid: Uniform, increasing log-stake grid
+        offset: Log-factor to shift by
+
+    Returns:
+        Shifted mass
+    """
+    if len(grid) == 1:
+        return mass.copy()
+
+    spacing = grid[1] - grid[0]
+    cells = math.floor(offset / spacing)
+    upper_weight = math.expm1(offset - cells * spacing) / math.expm1(spacing)
+    return ((1 - upper_weight) * _shift_cells(mass, cells)
+            + upper_weight * _shift_cells(mass, cells + 1))
+
+
+def _shift_cells(mass: np.ndarray, cells: int) -> np.ndarray:
+    """Shift mass by a whole number of grid cells, clamping at the edges."""
+    size = len(mass)
+    shifted = np.zeros(size)
+    if cells >= size:
+        shifted[-1] = mass.sum()
+    elif cells >= 0:
+        shifted[cells:] = mass[:size - cells]
+        shifted[-1] += mass[size - cells:].sum()
+    elif -cells >= size:
+        shifted[0] = mass.sum()
+    else:
+        shifted[:cells] = mass[-cells:]
+        shifted[0] += mass[:-cells].sum()
+    return shifted
+
+
+def _binomial_log_factors(games: int, p: float, win_factor: float,
+                          loss_factor: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Enumerate the surviving outcomes of a run of games with fixed stake factors.
+
+    Args:
+        games: Number of games in the run
+        p: Win probability per game
+        win_factor: Stake multiplier on a win
+        loss_factor: Stake multiplier on a loss (0.0 means bust)
+
+    Returns:
+        Tuple of (log stake factor, probability) per surviving win count.
+        The probabilities sum to less than 1 when losses cause bankruptcy.
+    """
+    wins = np.arange(games + 1)
+    if loss_factor <= 0:
+        wins = wins[-1:]
+
+    log_pmf = np.array([
+        math.lgamma(games + 1) - math.lgamma(n + 1) - math.lgamma(games - n + 1)
+        for n in wins.tolist()
+    ]) + wins * math.log(p) + (games - wins) * math.log1p(-p)
+
+    log_loss = math.log(loss_factor) if loss_factor > 0 else 0.0
+    log_factors = wins * math.log(win_factor) + (games - wins) * log_loss
+    return log_factors, np.exp(log_pmf)
+
+
+def weighted_quantiles(values: np.ndarray, weights: np.ndarray,
+                       quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Get weighted quantiles: the smallest values whose cumulative weight reaches q.
+
+    Args:
+        values: Sample values, in any order
+        weights: Non-negative weight of each value
+        quantiles: Quantiles between 0 and 1
+
+    Returns:
+        Value at each quantile
+    """
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    indices = np.searchsorted(cumulative, np.asarray(quantiles, dtype=np.float64) * cumulative[-1])
+    return np.asarray(values)[order[np.minimum(indices, len(values) - 1)]]
+
+
+def partition_quantiles(values: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Get unweighted quantiles in linear time, partitioning values in place.
+
+    All requested order statistics are selected by one np.partition call
+    instead of a full sort; the quantile convention matches weighted_quantiles.
+
+    Args:
+        values: Sample values; reordered in place
+        quantiles: Quantiles between 0 and 1
+
+    Returns:
+        Value at each quantile
+    """
+    count = len(values)
+    ranks = np.ceil(np.asarray(quantiles, dtype=np.float64) * count).astype(np.int64) - 1
+    ranks = np.clip(ranks, 0, count - 1)
+    values.partition(np.unique(ranks))
+    return values[ranks]
+
+
+def make_seed_sequence(seed: SeedLike) -> np.random.SeedSequence:
+    """
+    Normalize a seed argument to a SeedSequence.
+
+    Args:
+        seed: Integer seed, SeedSequence, Generator or None for OS entropy.
+            A Generator is advanced to draw the entropy for the new sequence.
+
+    Returns:
+        Seed sequence to derive random streams from
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(seed.bit_generator.random_raw(4).tolist())
+    return np.random.SeedSequence(seed)
+
+
+def multiplier_tables(strategy: Strategy, total_games: int,
+                      payout_ratio: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Precompute the stake multipliers of a stake-proportional strategy.
+
+    A proportional bet turns every game into a multiplication of the stake by
+    a factor that depends only on the game and its outcome, so a path is a
+    product of table lookups.
+
+    Args:
+        strategy: Betting strategy
+        total_games: Number of games per series
+        payout_ratio: Payout ratio of a win
+
+    Returns:
+        Tuple of (win multipliers, loss multipliers) indexed by game number,
+        or None if the strategy is not stake-proportional
+    """
+    fractions = [strategy.fraction(r) for r in range(total_games, 0, -1)]
+    if any(f is None for f in fractions):
+        return None
+
+    fractions = np.array(fractions, dtype=np.float64)
+    return 1 + fractions * (payout_ratio - 1), 1 - fractions
+
+
+def _jit_game_loop(uniforms: np.ndarray, initial_stake: float, win_chance: float,
+                   net_payout: float, win_multipliers: np.ndarray,
+                   loss_multipliers: np.ndarray, martingale_base: float,
+                   final_stakes: np.ndarray) -> None:
+    """
+    Per-path game loop compiled by numba, parallel over paths.
+
+    Args:
+        uniforms: Uniform draws with shape (paths, games)
+        initial_stake: Starting stake of every path
+        win_chance: Probability of winning a game
+        net_payout: Winnings per unit bet (payout_ratio - 1)
+        win_multipliers: Stake factor per game on a win, for proportional strategies
+        loss_multipliers: Stake factor per game on a loss, for proportional strategies
+        martingale_base: Martingale base bet, or 0.0 for proportional betting
+        final_stakes: Output array, one entry per path
+    """
+    num_paths, total_games = uniforms.shape
+    for i in _prange(num_paths):
+        stake = initial_stake
+        next_bet = martingale_base
+
+        for game in range(total_games):
+            won = uniforms[i, game] < win_chance
+            if martingale_base <= 0:
+                stake *= win_multipliers[game] if won else loss_multipliers[game]
+            elif won:
+                stake += min(next_bet, stake) * net_payout
+                next_bet = martingale_base
+            else:
+                stake -= min(next_bet, stake)
+                next_bet = 2 * next_bet
+
+            if stake <= 0:
+                stake = 0.0
+                break
+
+        final_stakes[i] = stake
+
+
+_prange = range  # numba.prange once the kernels are compiled
+_parallel_kernel_used = False  # Whether this process has run _jit_game_loop compiled
+
+
+@dataclass
+class FusedStatistics:
+    """Sums, extremes, bust count and histogram of final stakes from one pass."""
+
+    count: int
+    total: float
+    total_squares: float
+    bust_count: int
+    minimum: float
+    maximum: float
+    bin_counts: Optional[np.ndarray] = None  # Winning stakes per histogram bin
+
+    @property
+    def mean(self) -> float:
+        """Mean of the values."""
+        return self.total / self.count
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the values (less accurate than Welford's for large means)."""
+        if self.count < 2:
+            return 0.0
+        return max(self.total_squares - self.total * self.mean, 0.0) / (self.count - 1)
+
+
+def fused_statistics(values: np.ndarray, edges: Optional[np.ndarray] = None,
+                     block_size: int = 1 << 16,
+                     min_kernel_size: int = 1 << 22) -> FusedStatistics:
+    """
+    Compute sums, extremes, bust count and optionally a histogram in one pass.
+
+    For large arrays with numba installed, a compiled loop reads every value
+    once; otherwise the values are processed in blocks small enough to stay
+    in cache while all the reductions run over them. Either way the array
+    streams from memory once, instead of once per statistic. Small arrays
+    skip the kernel, since importing numba and loading the kernel costs far
+    more than the NumPy passes over them.
+
+    Args:
+        values: Final stakes (0.0 for bankruptcy)
+        edges: Evenly spaced histogram bin edges; only winning (positive)
+            stakes are binned, the last bin including its right edge
+        block_size: Values per block for the NumPy fallback
+        min_kernel_size: Fewest values the compiled kernel is used for
+
+    Returns:
+        Statistics of the values
+    """
+    bins = 0 if edges is None else len(edges) - 1
+    low, high = (0.0, 0.0) if edges is None else (float(edges[0]), float(edges[-1]))
+    bin_counts = np.zeros(bins, dtype=np.int64)
+
+    kernels = _jit_kernels() if len(values) >= min_kernel_size else None
+    if kernels is not None:
+        totals = kernels[1](np.ascontiguousarray(values), low, high, bin_counts)
+        total, total_squares, bust_count, minimum, maximum = totals
+    else:
+        total = total_squares = 0.0
+        bust_count = 0
+        minimum, maximum = math.inf, -math.inf
+        scale = bins / (high - low) if bins else 0.0
+        for start in range(0, len(values), block_size):
+            block = np.asarray(values[start:start + block_size], dtype=np.float64)
+            total += float(block.sum())
+            total_squares += float(np.dot(block, block))
+            bust_count += int(np.count_nonzero(block == 0.0))
+            minimum = min(minimum, float(block.min()))
+            maximum = max(maximum, float(block.max()))
+            if bins:
+                binned = block[(block > 0) & (block >= low) & (block <= high)]
+                indices = np.minimum(((binned - low) * scale).astype(np.int64), bins - 1)
+                bin_counts += np.bincount(indices, minlength=bins)
+
+    return FusedStatistics(len(values), float(total), float(total_squares), int(bust_count),
+                           float(minimum), float(maximum), bin_counts if bins else None)
+
+
+def _fused_kernel(values: np.ndarray, low: float, high: float,
+                  bin_counts: np.ndarray) -> Tuple[float, float, int, float, float]:
+    """
+    Single-pass statistics loop compiled by numba.
+
+    Args:
+        values: Final stakes
+        low: Left edge of the first histogram bin
+        high: Right edge of the last histogram bin
+        bin_counts: Histogram counts to add to, one per bin (may be empty)
+
+    Returns:
+        Tuple of (sum, sum of squares, bust count, minimum, maximum)
+    """
+    bins = len(bin_counts)
+    scale = bins / (high - low) if bins else 0.0
+    total = 0.0
+    total_squares = 0.0
+    bust_count = 0
+    minimum = np.inf
+    maximum = -np.inf
+
+    for i in range(len(values)):
+        value = float(values[i])
+        total += value
+        total_squares += value * value
+        minimum = min(minimum, value)
+        maximum = max(maximum, value)
+        if value == 0.0:
+            bust_count += 1
+        elif bins and low <= value <= high:
+            bin_counts[min(int((value - low) * scale), bins - 1)] += 1
+
+    return total, total_squares, bust_count, minimum, maximum
+
+
+@functools.lru_cache(maxsize=None)
+def _jit_kernels() -> Optional[Tuple[Callable, Callable]]:
+    """
+    Import numba and compile the kernels on first use.
+
+    numba dominates the module's import time, so it is only imported once a
+    kernel is needed; processes that never use one, such as pool workers of
+    the other engines, do not pay for it.
+
+    Returns:
+        Tuple of (game loop, fused statistics) kernels, or None without numba
+    """
+    global _prange
+    try:
+        import numba
+    except ImportError:  # The "jit" engine falls back to the scalar engine
+        return None
+
+    _prange = numba.prange
+    return (numba.njit(parallel=True, cache=True)(_jit_game_loop),
+            numba.njit(cache=True)(_fused_kernel))
+
+
+def _simulate_chunk(simulator: BettingSimulator, chunk_index: int) -> np.ndarray:
+    """
+    Worker entry point: simulate one chunk of paths in a separate process.
+
+    Args:
+        simulator: Simulator of the job (config, strategy and root seed)
+        chunk_index: Index of the chunk to simulate
+
+    Returns:
+        Array of final stakes for the chunk
+    """
+    return simulator.simulate_chunk(chunk_index)
+
+
+def _simulate_chunk_with_wins(simulator: BettingSimulator,
+                              chunk_index: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Worker entry point: simulate one chunk, keeping per-path win counts.
+
+    Args:
+        simulator: Simulator of the job (config, strategy and root seed)
+        chunk_index: Index of the chunk to simulate
+
+    Returns:
+        Tuple of (final stakes, win counts) for the chunk
+    """
+    return simulator.simulate_chunk(chunk_index, return_win_counts=True)
+
+
+def _simulate_chunk_weighted(simulator: BettingSimulator,
+                             chunk_index: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Worker entry point: simulate one chunk, keeping likelihood-ratio weights.
+
+    Args:
+        simulator: Simulator of the job (config, strategy and root seed)
+        chunk_index: Index of the chunk to simulate
+
+    Returns:
+        Tuple of (final stakes, weights) for the chunk
+    """
+    return simulator.simulate_chunk(chunk_index, return_weights=True)
+
+
+def _quantize_chunk(simulator: BettingSimulator, chunk_index: int,
+                    relative_precision: float) -> QuantizedResults:
+    """
+    Worker entry point: simulate one chunk and compress its final stakes.
+
+    Args:
+        simulator: Simulator of the job (config, strategy and root seed)
+        chunk_index: Index of the chunk to simulate
+        relative_precision: Maximum relative error of a stored value
+
+    Returns:
+        Compressed final stakes of the chunk
+    """
+    return QuantizedResults.from_stakes(simulator.simulate_chunk(chunk_index), relative_precision)
+
+
+def _simulate_log_chunk(simulator: BettingSimulator, chunk_index: int) -> np.ndarray:
+    """
+    Worker entry point: simulate one chunk of log-stakes in a separate process.
+
+    Args:
+        simulator: Simulator of the job (config, strategy and root seed)
+        chunk_index: Index of the chunk to simulate
+
+    Returns:
+        Array of final log-stakes for the chunk
+    """
+    return simulator.simulate_log_chunk(chunk_index)
+
+
+def _summarize_chunk(simulator: BettingSimulator, chunk_index: int,
+                     histogram: Optional["StakeHistogram"] = None) -> "StreamingStatistics":
+    """
+    Worker entry point: simulate one chunk and reduce it to summary statistics.
+
+    Args:
+        simulator: Simulator of the job (config, strategy and root seed)
+        chunk_index: Index of the chunk to simulate
+        histogram: Bins to also count the chunk's final stakes into
+
+    Returns:
+        Summary of the chunk's final stakes
+    """
+    summary = StreamingStatistics(histogram=histogram)
+    summary.update(simulator.simulate_chunk(chunk_index))
+    return summary
+
+
+class StakeHistogram:
+    """
+    Counts of final stakes over fixed bins, accumulated batch by batch.
+
+    Busts are counted apart from the bins, and winning stakes below the first
+    edge or above the last go to underflow and overflow counters, so every
+    stake is accounted for. Accumulators with the same edges can be merged.
+    """
+
+    def __init__(self, edges: Sequence[float], log_scale: bool = False):
+        """
+        Initialize empty bins.
+
+        Args:
+            edges: Increasing bin edges; the last bin includes its right edge
+            log_scale: Whether the bins are log-spaced (plotted on a log axis)
+        """
+        edges = np.asarray(edges, dtype=np.float64)
+        if edges.ndim != 1 or len(edges) < 2 or np.any(np.diff(edges) <= 0):
+            raise ValueError("Histogram edges must be increasing, with at least one bin")
+
+        self.edges = edges
+        self.log_scale = log_scale
+        self.counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        self.bust_count = 0
+        self.underflow = 0
+        self.overflow = 0
+
+    @classmethod
+    def linear(cls, high: float, bins: int = 100, low: float = 0.0) -> "StakeHistogram":
+        """
+        Create evenly spaced bins.
+
+        Args:
+            high: Right edge of the last bin
+            bins: Number of bins
+            low: Left edge of the first bin
+
+        Returns:
+            Empty histogram
+        """
+        return cls(np.linspace(low, high, bins + 1))
+
+    @classmethod
+    def logarithmic(cls, low: float, high: float, bins: int = 100) -> "StakeHistogram":
+        """
+        Create log-spaced bins, for stakes spanning many orders of magnitude.
+
+        Args:
+            low: Left edge of the first bin (positive)
+            high: Right edge of the last bin
+            bins: Number of bins
+
+        Returns:
+            Empty histogram
+        """
+        if low <= 0:
+            raise ValueError("Log-spaced bins need a positive lower edge")
+        return cls(np.geomspace(low, high, bins + 1), log_scale=True)
+
+    @property
+    def count(self) -> int:
+        """Number of final stakes counted, busts included."""
+        return int(self.counts.sum()) + self.bust_count + self.underflow + self.overflow
+
+    def empty_copy(self) -> "StakeHistogram":
+        """Histogram with the same bins and no counts."""
+        return StakeHistogram(self.edges, self.log_scale)
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Count a batch of final stakes.
+
+        Args:
+            values: Final stakes to count
+        """
+        values = np.asarray(values)
+        positive = values[values > 0]
+        self.bust_count += values.size - positive.size
+
+        bins = len(self.counts)
+        indices = np.searchsorted(self.edges, positive, side="right") - 1
+        indices[positive == self.edges[-1]] = bins - 1
+        inside = (indices >= 0) & (indices < bins)
+        self.underflow += int(np.count_nonzero(indices < 0))
+        self.overflow += int(np.count_nonzero(indices >= bins))
+        self.counts += np.bincount(indices[inside], minlength=bins)
+
+    def merge(self, other: "StakeHistogram") -> None:
+        """
+        Add the counts of another histogram with the same edges.
+
+        Args:
+            other: Histogram to merge (left unchanged)
+        """
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Only histograms with the same edges can be merged")
+        self.counts += other.counts
+        self.bust_count += other.bust_count
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+
+class StreamingStatistics:
+    """
+    Online summary of final stakes that never stores the individual results.
+
+    Tracks count, mean and variance (Welford's algorithm, merged batch-wise with
+    Chan's update), bust count, min/max, and a merging t-digest for approximate
+    median and quantiles. Busts are an exact atom at 0.0 and are kept out of
+    the digest, which only summarizes surviving stakes. Optionally also counts
+    the stakes into fixed histogram bins. Accumulators from separate chunks
+    can be merged.
+    """
+
+    def __init__(self, compression: int = 200,
+                 histogram: Optional[StakeHistogram] = None):
+        """
+        Initialize an empty accumulator.
+
+        Args:
+            compression: t-digest compression; higher keeps more centroids and
+                gives more accurate quantiles
+            histogram: Bins to count final stakes into (only the edges are
+                used; the accumulator keeps its own empty copy)
+        """
+        self.compression = compression
+        self.histogram = histogram.empty_copy() if histogram is not None else None
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.bust_count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.positive_min = math.inf
+        self.centroid_means = np.empty(0)
+        self.centroid_weights = np.empty(0)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the values seen so far."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of the values seen so far."""
+        return math.sqrt(self.variance)
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add a batch of final stakes.
+
+        Args:
+            values: Final stakes to add
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        if self.histogram is not None:
+            self.histogram.update(values)
+
+        batch_mean = float(values.mean())
+        batch_m2 = float(np.square(values - batch_mean).sum())
+        survivors = values[values != 0.0]
+        self._combine(values.size, batch_mean, batch_m2, values.size - survivors.size,
+                      float(values.min()), float(values.max()),
+                      float(survivors.min()) if survivors.size else math.inf,
+                      survivors, np.ones(survivors.size))
+
+    def merge(self, other: "StreamingStatistics") -> None:
+        """
+        Fold another accumulator into this one.
+
+        Args:
+            other: Accumulator to merge (left unchanged)
+        """
+        if other.count == 0:
+            return
+        if self.histogram is not None and other.histogram is not None:
+            self.histogram.merge(other.histogram)
+        self._combine(other.count, other.mean, other.m2, other.bust_count,
+                      other.min, other.max, other.positive_min,
+                      other.centroid_means, other.centroid_weights)
+
+    def mean_interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        """
+        Normal-approximation confidence interval for the mean.
+
+        Args:
+            confidence: Confidence level
+
+        Returns:
+            Tuple of (lower, upper) bounds
+        """
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        halfwidth = z * self.std / math.sqrt(self.count) if self.count else math.inf
+        return self.mean - halfwidth, self.mean + halfwidth
+
+    def bust_rate_interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        """
+        Wilson score confidence interval for the bust rate.
+
+        Unlike the normal approximation it stays sensible for rates near 0 or 1.
+
+        Args:
+            confidence: Confidence level
+
+        Returns:
+            Tuple of (lower, upper) bounds on the bust rate as a fraction
+        """
+        if self.count == 0:
+            return 0.0, 1.0
+
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        rate = self.bust_count / self.count
+        denominator = 1 + z * z / self.count
+        center = (rate + z * z / (2 * self.count)) / denominator
+        halfwidth = z * math.sqrt(rate * (1 - rate) / self.count
+                                  + z * z / (4 * self.count ** 2)) / denominator
+        return max(0.0, center - halfwidth), min(1.0, center + halfwidth)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile from the t-digest.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Approximate value at quantile q
+        """
+        if self.count == 0:
+            raise ValueError("No values have been added")
+
+        rank = q * self.count - self.bust_count
+        survivors = self.count - self.bust_count
+        if rank <= 0 or survivors == 0:
+            return 0.0
+
+        # Centroid i sits at the midpoint of its weight; the extremes pin the ends
+        cumulative = np.cumsum(self.centroid_weights) - self.centroid_weights / 2
+        positions = np.concatenate(([0.0], cumulative, [float(survivors)]))
+        values = np.concatenate(([self.positive_min], self.centroid_means, [self.max]))
+        return float(np.interp(rank, positions, values))
+
+    def _combine(self, count: int, mean: float, m2: float, bust_count: int,
+                 minimum: float, maximum: float, positive_min: float,
+                 centroid_means: np.ndarray, centroid_weights: np.ndarray) -> None:
+        """Merge a batch described by its moments and centroids into this accumulator."""
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.bust_count += bust_count
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+        self.positive_min = min(self.positive_min, positive_min)
+
+        means = np.concatenate((self.centroid_means, centroid_means))
+        weights = np.concatenate((self.centroid_weights, centroid_weights))
+        if means.size:
+            self.centroid_means, self.centroid_weights = self._compress(means, weights)
+
+    def _compress(self, means: np.ndarray,
+                  weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Merge sorted neighbouring centroids that share a unit of the k1 scale.
+
+        The arcsine scale function keeps centroids small near the tails and
+        large around the median, bounding the digest to about compression / 2
+        centroids.
+        """
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        midpoints = (np.cumsum(weights) - weights / 2) / weights.sum()
+        scale = self.compression / (2 * math.pi) * np.arcsin(2 * midpoints - 1)
+        groups = np.floor(scale)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(groups)) + 1))
+
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        return merged_means, merged_weights
+
+
+@dataclass
+class AdaptiveResult:
+    """Outcome of a precision-targeted run from BettingSimulator.run_adaptive."""
+
+    summary: StreamingStatistics
+    confidence: float
+    mean_interval: Tuple[float, float]
+    bust_rate_interval: Tuple[float, float]  # As fractions, not percent
+    converged: bool  # False if the budget ran out first
+
+    @property
+    def num_simulations(self) -> int:
+        """Number of simulations actually run."""
+        return self.summary.count
+
+
+def _precision_met(summary: StreamingStatistics, confidence: float,
+                   mean_relative_halfwidth: Optional[float],
+                   bust_rate_halfwidth: Optional[float]) -> bool:
+    """Check whether a summary's confidence intervals meet every given target."""
+    if mean_relative_halfwidth is not None:
+        lower, upper = summary.mean_interval(confidence)
+        if summary.mean == 0 or (upper - lower) / 2 > mean_relative_halfwidth * abs(summary.mean):
+            return False
+    if bust_rate_halfwidth is not None:
+        lower, upper = summary.bust_rate_interval(confidence)
+        if (upper - lower) / 2 > bust_rate_halfwidth:
+            return False
+    return True
+
+
+class ResultFile:
+    """
+    Memory-mapped on-disk store of final stakes.
+
+    Layout: an 8-byte magic string, a 4-byte little-endian header length, a
+    JSON header with the GameConfig fields, the seed, the strategy and the
+    array dtype, and then the raw final stakes starting at a 64-byte aligned
+    offset.
+    """
+
+    MAGIC = b"BETSIM01"
+    ALIGNMENT = 64
+
+    def __init__(self, path: str, config: GameConfig,
+                 seed_sequence: np.random.SeedSequence, stakes: np.memmap, strategy: str):
+        """
+        Wrap an opened result file; use create or open instead of calling this directly.
+
+        Args:
+            path: File path
+            config: Configuration the results were produced with
+            seed_sequence: Root seed sequence of the run
+            stakes: Memory-mapped final stakes
+            strategy: Recorded repr of the betting strategy
+        """
+        self.path = path
+        self.config = config
+        self.seed_sequence = seed_sequence
+        self.stakes = stakes
+        self.strategy = strategy
+
+    @classmethod
+    def create(cls, path: str, config: GameConfig, seed_sequence: np.random.SeedSequence,
+               strategy: Optional[Strategy] = None) -> "ResultFile":
+        """
+        Create a result file sized for config.num_simulations results.
+
+        Args:
+            path: File path (overwritten if it exists)
+            config: Configuration the results will be produced with
+            seed_sequence: Root seed sequence of the run
+            strategy: Betting strategy, recorded by its repr for reference
+
+        Returns:
+            Result file open for writing
+        """
+        if strategy is None:
+            strategy = HybridStrategy.from_config(config)
+        header = json.dumps({
+            "config": asdict(config),
+            "seed_entropy": seed_sequence.entropy,
+            "seed_spawn_key": list(seed_sequence.spawn_key),
+            "strategy": repr(strategy),
+            "dtype": config.result_dtype,
+        }).encode()
+        prefix = len(cls.MAGIC) + 4 + len(header)
+        offset = -(-prefix // cls.ALIGNMENT) * cls.ALIGNMENT
+
+        with open(path, "wb") as f:
+            f.write(cls.MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            f.write(b" " * (offset - prefix))
+
+        stakes = np.memmap(path, dtype=config.result_dtype, mode="r+",
+                           offset=offset, shape=(config.num_simulations,))
+        return cls(path, config, seed_sequence, stakes, repr(strategy))
+
+    @classmethod
+    def open(cls, path: str) -> "ResultFile":
+        """
+        Open an existing result file read-only.
+
+        Args:
+            path: File path
+
+        Returns:
+            Result file whose stakes are memory-mapped, not loaded
+        """
+        with open(path, "rb") as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a simulation result file")
+            header_length = int.from_bytes(f.read(4), "little")
+            header = json.loads(f.read(header_length))
+
+        prefix = len(cls.MAGIC) + 4 + header_length
+        offset = -(-prefix // cls.ALIGNMENT) * cls.ALIGNMENT
+        config = GameConfig(**header["config"])
+        seed_sequence = np.random.SeedSequence(header["seed_entropy"],
+                                               spawn_key=tuple(header["seed_spawn_key"]))
+        stakes = np.memmap(path, dtype=header["dtype"], mode="r",
+                           offset=offset, shape=(config.num_simulations,))
+        return cls(path, config, seed_sequence, stakes, header["strategy"])
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        """
+        Iterate over the stored final stakes in contiguous blocks.
+
+        Args:
+            block_size: Number of results per block
+
+        Returns:
+            Iterator over memory-mapped views of each block
+        """
+        for start in range(0, len(self.stakes), block_size):
+            yield self.stakes[start:start + block_size]
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of simulation results and summaries.
+
+    Entries are keyed by a stable hash of the GameConfig fields that affect
+    results, the seed, the engine version and the RNG algorithm. Reading an
+    entry marks it as recently used, and the least recently used entries are
+    evicted once the cache grows past max_bytes.
+    """
+
+    # Fields that only change how a run is executed, not its results
+    EXECUTION_FIELDS = ("workers",)
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30):
+        """
+        Initialize the cache, creating its directory if needed.
+
+        Args:
+            directory: Directory holding the cache entries
+            max_bytes: Total size above which old entries are evicted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def make_key(cls, config: GameConfig, seed_sequence: np.random.SeedSequence,
+                 kind: str, rng_algorithm: str, strategy: Strategy) -> str:
+        """
+        Build the cache key for one run.
+
+        Args:
+            config: Configuration of the run
+            seed_sequence: Root seed sequence of the run
+            kind: What is being cached, e.g. "results" or "summary"
+            rng_algorithm: Name of the bit generator, e.g. "PCG64"
+            strategy: Betting strategy; built-in strategies are dataclasses with a
+                stable repr
+
+        Returns:
+            Hex digest identifying the run
+        """
+        fields = {name: value for name, value in asdict(config).items()
+                  if name not in cls.EXECUTION_FIELDS}
+        description = json.dumps({
+            "config": fields,
+            "seed_entropy": seed_sequence.entropy,
+            "seed_spawn_key": list(seed_sequence.spawn_key),
+            "kind": kind,
+            "strategy": repr(strategy),
+            "engine_version": ENGINE_VERSION,
+            "rng_algorithm": rng_algorithm,
+        }, sort_keys=True)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def get(self, key: str) -> Any:
+        """
+        Load a cached entry and mark it as recently used.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached array or summary, or None on a miss
+        """
+        path = self._find(key)
+        if path is None:
+            return None
+
+        os.utime(path)
+        if path.endswith(".npy"):
+            return np.load(path)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store an entry, then evict least recently used entries if over budget.
+
+        An entry that alone exceeds max_bytes is not written, since eviction
+        would remove it straight away.
+
+        Args:
+            key: Cache key from make_key
+            value: NumPy array (stored as .npy) or any picklable summary
+        """
+        if isinstance(value, np.ndarray):
+            size = value.nbytes
+        else:
+            payload = pickle.dumps(value)
+            size = len(payload)
+        if size > self.max_bytes:
+            print(f"Not caching {size} byte entry; cache limit is {self.max_bytes} bytes")
+            return
+
+        if isinstance(value, np.ndarray):
+            np.save(os.path.join(self.directory, key + ".npy"), value)
+        else:
+            with open(os.path.join(self.directory, key + ".pkl"), "wb") as f:
+                f.write(payload)
+        self._evict()
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Remove one entry, or every entry when no key is given.
+
+        Args:
+            key: Cache key to remove (None clears the whole cache)
+        """
+        if key is not None:
+            path = self._find(key)
+            if path is not None:
+                os.remove(path)
+            return
+
+        for path in self._entries():
+            os.remove(path)
+
+    def _find(self, key: str) -> Optional[str]:
+        """Path of the entry for a key, if present."""
+        for suffix in (".npy", ".pkl"):
+            path = os.path.join(self.directory, key + suffix)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _entries(self) -> List[str]:
+        """Paths of all cache entries."""
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith((".npy", ".pkl"))]
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in entries)
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+
+class ParameterSweep:
+    """
+    Runs a grid of GameConfig variations as one batched computation.
+
+    All configurations are simulated together as a paths x configs array and
+    share the same random draws (common random numbers), so the RNG cost is
+    paid once per block of configurations and differences between
+    configurations are not swamped by sampling noise. Until some path goes
+    bust, each column matches a separate vectorized run of that configuration
+    with the same seed.
+    """
+
+    def __init__(self, base_config: GameConfig, grid: Dict[str, Sequence[float]],
+                 seed: SeedLike = None, max_block_bytes: int = 256 * 2**20):
+        """
+        Initialize the sweep.
+
+        Args:
+            base_config: Configuration providing the fixed parameters
+            grid: Values to try for each swept parameter; every combination is run
+            seed: Seed shared by all configurations
+            max_block_bytes: Memory budget for the final stakes of one block of
+                configurations
+        """
+        unknown = set(grid) - set(SWEEP_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Cannot sweep {sorted(unknown)}; choose from {SWEEP_PARAMETERS}")
+
+        self.parameters = list(grid)
+        self.configs = [replace(base_config, **dict(zip(self.parameters, values)))
+                        for values in itertools.product(*grid.values())]
+        for config in self.configs:
+            config.validate()
+
+        self.simulator = BettingSimulator(base_config, seed=seed)
+        self.block_size = max(1, max_block_bytes // (8 * base_config.num_simulations))
+
+    def run(self) -> List[Dict[str, float]]:
+        """
+        Run every configuration in the grid.
+
+        Returns:
+            One row per configuration with the swept parameter values and
+            average, median, bust_rate (percent) and bust_count
+        """
+        base = self.simulator.config
+        print(f"Running {base.num_simulations} simulations for each of "
+              f"{len(self.configs)} configurations...")
+
+        rows = []
+        for start in range(0, len(self.configs), self.block_size):
+            block = self.configs[start:start + self.block_size]
+            final_stakes = np.concatenate(
+                [self._simulate_block(block, chunk_index)
+                 for chunk_index in range(self.simulator.num_chunks)])
+
+            averages = final_stakes.mean(axis=0)
+            medians = np.median(final_stakes, axis=0)
+            bust_counts = np.count_nonzero(final_stakes == 0.0, axis=0)
+
+            for i, config in enumerate(block):
+                row = {name: getattr(config, name) for name in self.parameters}
+                row["average"] = float(averages[i])
+                row["median"] = float(medians[i])
+                row["bust_rate"] = float(bust_counts[i]) / base.num_simulations * 100
+                row["bust_count"] = int(bust_counts[i])
+                rows.append(row)
+
+        print("Sweep complete.")
+        return rows
+
+    def _simulate_block(self, block: List[GameConfig], chunk_index: int) -> np.ndarray:
+        """
+        Simulate one chunk of paths for a block of configurations at once.
+
+        Args:
+            block: Configurations to simulate side by side
+            chunk_index: Chunk whose random stream is shared by the block
+
+        Returns:
+            Final stakes with shape (paths, configs)
+        """
+        base = self.simulator.config
+        start = chunk_index * base.chunk_size
+        num_paths = min(base.chunk_size, base.num_simulations - start)
+        rng = self.simulator.chunk_rng(chunk_index)
+
+        win_chance = np.array([config.win_chance for config in block])
+        stakes = np.tile([config.initial_stake for config in block], (num_paths, 1)).astype(np.float64)
+
+        # Multiplier tables with shape (games, configs), one column per configuration
+        tables = [multiplier_tables(HybridStrategy.from_config(config),
+                                    base.total_games, config.payout_ratio)
+                  for config in block]
+        win_multipliers = np.stack([table[0] for table in tables], axis=1)
+        loss_multipliers = np.stack([table[1] for table in tables], axis=1)
+
+        for game in range(base.total_games):
+            # One row of draws is compared against every configuration's win chance
+            wins = rng.random(num_paths)[:, None] < win_chance
+            stakes *= np.where(wins, win_multipliers[game], loss_multipliers[game])
+
+        # A zero loss multiplier zeroes the stake for good
+        stakes[stakes <= 0] = 0.0
+        return stakes
+
+
+class SimulationAnalyzer:
+    """Analyzes and reports on simulation results."""
+
+    def __init__(self, config: GameConfig,
+                 final_stakes: Optional[Union[np.ndarray, List[float], ExactDistribution,
+                                              QuantizedResults]] = None,
+                 summary: Optional[StreamingStatistics] = None,
+                 win_counts: Optional[np.ndarray] = None,
+                 weights: Optional[np.ndarray] = None,
+                 strategy: Optional[Union[Strategy, str]] = None,
+                 log_stakes: Optional[np.ndarray] = None):
+        """
+        Initialize the analyzer.
+
+        Args:
+            config: Game configuration used for simulations
+            final_stakes: Results from all simulations (used in place when given
+                as an array), compressed results from run_simulations(quantize=...),
+                or an exact distribution from BettingSimulator.exact_distribution
+            summary: Streaming summary to report from when final_stakes were not kept
+            win_counts: Wins per simulation, used as a control variate for the mean
+            weights: Weight per final stake, such as the likelihood ratios from
+                BettingSimulator.run_importance_sampling or the multiplicities
+                of deduplicated results
+            strategy: Betting strategy the results were produced with, or its
+                recorded repr; defaults to the hybrid strategy of the config
+            log_stakes: Final log-stakes from BettingSimulator.run_log_simulations,
+                in place of final_stakes; busts are the -inf entries, so stakes
+                too small for float64 are not mistaken for them
+        """
+        if final_stakes is None and summary is None and log_stakes is None:
+            raise ValueError("Final stakes, log-stakes or a summary is required")
+        if log_stakes is not None and (final_stakes is not None or weights is not None):
+            raise ValueError("Log-stakes cannot be combined with final stakes or weights")
+        if weights is not None and (final_stakes is None
+                                    or isinstance(final_stakes, (ExactDistribution, QuantizedResults))
+                                    or len(weights) != len(final_stakes)):
+            raise ValueError("Weights need one entry per final stake")
+
+        self.config = config
+        self.final_stakes = final_stakes
+        self.summary = summary
+        self.win_counts = win_counts
+        self.weights = weights
+        self.log_stakes = log_stakes
+        default_strategy = HybridStrategy.from_config(config)
+        if strategy in (None, "None", repr(default_strategy)):
+            strategy = default_strategy
+        self.strategy = strategy
+        # Memoized metrics and the result buffers they were computed from
+        self._metrics: Dict[str, Any] = {}
+        self._metric_sources: Tuple[Any, ...] = ()
+        self.result_file: Optional[ResultFile] = None
+        self.block_size = 1 << 20
+
+    @classmethod
+    def from_file(cls, path: str, block_size: int = 1 << 20) -> "SimulationAnalyzer":
+        """
+        Create an analyzer for a result file written by BettingSimulator.run_to_file.
+
+        Statistics and histograms are computed by streaming over the
+        memory-mapped results one block at a time, so the file never has to
+        fit in memory. The median is approximate (t-digest).
+
+        Args:
+            path: Result file path
+            block_size: Number of results read per block
+
+        Returns:
+            Analyzer reporting on the file's results
+        """
+        result_file = ResultFile.open(path)
+        summary = StreamingStatistics()
+        for block in result_file.iter_blocks(block_size):
+            summary.update(block)
+
+        analyzer = cls(result_file.config, summary=summary, strategy=result_file.strategy)
+        analyzer.result_file = result_file
+        analyzer.block_size = block_size
+        return analyzer
+
+    def calculate_statistics(self) -> Tuple[float, float, float, int]:
+        """
+        Calculate key statistics from simulation results.
+
+        The median is approximate when reporting from a streaming summary.
+        Weighted results (importance weights, compressed results or an exact
+        distribution) give weighted estimates, and the bust count is then the
+        expected number over config.num_simulations runs. Each statistic is
+        computed on first use and remembered for later reports.
+
+        Returns:
+            Tuple of (average, median, bust_rate_percent, bust_count)
+        """
+        average = self._memoized("average", self._compute_average)
+        median = self._memoized("median", self._compute_median)
+        bust_rate, bust_count = self._memoized("bust", self._compute_bust)
+        return average, median, bust_rate, bust_count
+
+    def quantiles(self, quantiles: Sequence[float]) -> np.ndarray:
+        """
+        Get final stakes at several quantiles, taking weights into account.
+
+        Args:
+            quantiles: Quantiles between 0 and 1
+
+        Returns:
+            Final stake at each quantile (approximate from a streaming summary)
+        """
+        quantiles = tuple(float(q) for q in quantiles)
+        return self._memoized(f"quantiles:{quantiles}",
+                              lambda: self._compute_quantiles(quantiles)).copy()
+
+    def _memoized(self, name: str, compute: Callable[[], Any]) -> Any:
+        """
+        Get a metric, computing it only if it is not known for the current results.
+
+        Metrics are remembered against the identity of the result buffers
+        (final stakes, log-stakes, weights and win counts): assigning new results discards
+        them, but result arrays must not be modified in place. Metrics of a
+        streaming summary are never remembered, since summaries are meant to
+        keep being updated and their metrics are cheap to read.
+
+        Args:
+            name: Name of the metric
+            compute: Computes the metric from the current results
+
+        Returns:
+            Value of the metric
+        """
+        if self.final_stakes is None and self.log_stakes is None:
+            return compute()
+
+        sources = (self.final_stakes, self.log_stakes, self.weights, self.win_counts)
+        if len(sources) != len(self._metric_sources) or any(
+                source is not known for source, known in zip(sources, self._metric_sources)):
+            self._metrics = {}
+            self._metric_sources = sources
+        if name not in self._metrics:
+            self._metrics[name] = compute()
+        return self._metrics[name]
+
+    def _compute_average(self) -> float:
+        """Mean final stake (weighted if the results are)."""
+        if self.log_stakes is not None:
+            # Scale by the largest stake so the sum neither overflows nor underflows
+            log_stakes = np.asarray(self.log_stakes, dtype=np.float64)
+            largest = log_stakes.max()
+            if largest == -np.inf:
+                return 0.0
+            with np.errstate(over="ignore"):
+                return float(np.exp(largest + np.log(np.exp(log_stakes - largest).mean())))
+        if self.final_stakes is None:
+            return self.summary.mean
+
+        stakes, weights = self._weighted_samples()
+        if weights is None:
+            return self._fused_statistics().mean
+        return float(np.dot(weights, stakes) / self._weight_total(weights))
+
+    def _weight_total(self, weights: np.ndarray) -> float:
+        """
+        Get the normalizer of weighted means and rates.
+
+        Likelihood ratios from a tilted run average one in expectation, so
+        dividing by the number of paths keeps the mean and bust rate unbiased;
+        dividing by their sum (self-normalizing) would bias rare-event rates
+        towards the few heavy survivor weights. Other weights (multiplicities
+        or probabilities) are normalized by their sum.
+
+        Args:
+            weights: Weight of each final stake
+
+        Returns:
+            Total the weighted sums are divided by
+        """
+        if self.weights is not None and self.config.tilted_win_chance is not None:
+            return float(len(weights))
+        return float(weights.sum())
+
+    def _fused_statistics(self) -> FusedStatistics:
+        """Sums, extremes and bust count of unweighted final stakes, from one pass."""
+        return self._memoized("fused", lambda: fused_statistics(self._weighted_samples()[0]))
+
+    def _compute_median(self) -> float:
+        """Median final stake (weighted if the results are)."""
+        if self.final_stakes is None and self.log_stakes is None:
+            return self.summary.quantile(0.5)
+
+        if self.log_stakes is None:
+            stakes, weights = self._weighted_samples()
+        else:
+            stakes, weights = self.log_stakes, None
+        if weights is None:
+            # np.median's convention: the mean of the two middle values for even counts
+            middle = len(stakes) // 2
+            partitioned = self._partitioned_stakes()
+            partitioned.partition([max(middle - 1, 0), middle])
+            lower, upper = partitioned[max(middle - 1, 0)], partitioned[middle]
+            if self.log_stakes is not None:
+                with np.errstate(over="ignore"):
+                    lower, upper = np.exp(lower), np.exp(upper)
+            return float(upper if len(stakes) % 2 else (lower + upper) / 2)
+        return float(weighted_quantiles(stakes, weights, [0.5])[0])
+
+    def _compute_bust(self) -> Tuple[float, int]:
+        """Bust rate in percent and bust count."""
+        if self.log_stakes is not None:
+            bust_count = int(np.count_nonzero(np.isneginf(self.log_stakes)))
+            return (bust_count / len(self.log_stakes)) * 100, bust_count
+        if self.final_stakes is None:
+            return (self.summary.bust_count / self.summary.count) * 100, self.summary.bust_count
+
+        stakes, weights = self._weighted_samples()
+        if weights is None:
+            bust_count = self._fused_statistics().bust_count
+            return (bust_count / len(stakes)) * 100, bust_count
+
+        bust_fraction = float(weights[stakes == 0.0].sum() / self._weight_total(weights))
+        return bust_fraction * 100, round(bust_fraction * self.config.num_simulations)
+
+    def _compute_quantiles(self, quantiles: Tuple[float, ...]) -> np.ndarray:
+        """Final stakes at the given quantiles (weighted if the results are)."""
+        if self.log_stakes is not None:
+            with np.errstate(over="ignore"):
+                return np.exp(partition_quantiles(self._partitioned_stakes(), quantiles))
+        if self.final_stakes is None:
+            return np.array([self.summary.quantile(q) for q in quantiles])
+
+        stakes, weights = self._weighted_samples()
+        if weights is None:
+            return partition_quantiles(self._partitioned_stakes(), quantiles)
+        return weighted_quantiles(stakes, weights, quantiles)
+
+    def _partitioned_stakes(self) -> np.ndarray:
+        """
+        Get the kept copy of unweighted final stakes used for order statistics.
+
+        Quantile queries partition the copy in place, so later queries only
+        refine an already mostly ordered array and final_stakes is untouched.
+        For log-stake results the copy holds log-stakes, which order the same.
+
+        Returns:
+            Copy of final_stakes (or log_stakes), partially ordered by earlier queries
+        """
+        results = self.final_stakes if self.log_stakes is None else self.log_stakes
+        return self._memoized("partitioned", lambda: np.array(results))
+
+    def _weighted_samples(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Get the final stakes with their weights.
+
+        An exact distribution is its values weighted by their probabilities,
+        and compressed results their values weighted by their counts.
+
+        Returns:
+            Tuple of (final stakes, weights), with None for equal weights
+        """
+        return self._memoized("samples", self._collect_samples)
+
+    def _collect_samples(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Final stakes and weights as arrays, for _weighted_samples."""
+        if isinstance(self.final_stakes, ExactDistribution):
+            return self.final_stakes.values, self.final_stakes.probabilities
+        if isinstance(self.final_stakes, QuantizedResults):
+            return self.final_stakes.values, self.final_stakes.counts.astype(np.float64)
+
+        stakes = np.asarray(self.final_stakes)
+        weights = None if self.weights is None else np.asarray(self.weights, dtype=np.float64)
+        return stakes, weights
+
+    def effective_sample_size(self) -> float:
+        """
+        Kish effective sample size of weighted results.
+
+        Returns:
+            (sum of weights)^2 / sum of squared weights, or the number of
+            simulations if the results are unweighted
+        """
+        if self.weights is None:
+            return float(self.config.num_simulations)
+        return self._memoized("effective_sample_size", self._compute_effective_sample_size)
+
+    def _compute_effective_sample_size(self) -> float:
+        """Kish effective sample size of the importance weights."""
+        weights = np.asarray(self.weights, dtype=np.float64)
+        return float(weights.sum() ** 2 / np.dot(weights, weights))
+
+    def variance_report(self) -> Dict[str, float]:
+        """
+        Estimate the mean final stake with the configured variance reduction.
+
+        Antithetic pairs (config.antithetic) are averaged before estimating.
+        When win counts are available they serve as a control variate: their
+        expectation is exactly total_games * win_chance, so the estimate is
+        corrected by the regression slope times the observed deviation.
+
+        Returns:
+            Dictionary with the estimate, its standard error, the plain Monte
+            Carlo standard error, the effective sample size (the number of
+            independent plain samples giving the same precision) and the
+            variance reduction factor
+        """
+        return dict(self._memoized("variance_report", self._compute_variance_report))
+
+    def _compute_variance_report(self) -> Dict[str, float]:
+        """Variance-reduced estimate of the mean, for variance_report."""
+        if self.final_stakes is None or isinstance(self.final_stakes,
+                                                   (ExactDistribution, QuantizedResults)):
+            raise ValueError("A variance report needs the individual final stakes")
+        if self.weights is not None:
+            raise ValueError("A variance report needs unweighted final stakes")
+
+        stakes = np.asarray(self.final_stakes, dtype=np.float64)
+        naive_variance = stakes.var(ddof=1) / len(stakes)
+        samples = stakes
+        controls = None if self.win_counts is None else np.asarray(self.win_counts, dtype=np.float64)
+
+        if self.config.antithetic:
+            paired = len(stakes) // 2 * 2
+            samples = (stakes[0:paired:2] + stakes[1:paired:2]) / 2
+            if controls is not None:
+                controls = (controls[0:paired:2] + controls[1:paired:2]) / 2
+
+        if controls is not None:
+            expected_wins = self.config.total_games * self.config.win_chance
+            covariance = np.cov(samples, controls)
+            slope = covariance[0, 1] / covariance[1, 1] if covariance[1, 1] > 0 else 0.0
+            samples = samples - slope * (controls - expected_wins)
+
+        variance = samples.var(ddof=1) / len(samples)
+        reduction = naive_variance / variance if variance > 0 else math.inf
+        return {
+            "estimate": float(samples.mean()),
+            "standard_error": math.sqrt(variance),
+            "naive_standard_error": math.sqrt(naive_variance),
+            "effective_sample_size": float(len(stakes) * reduction),
+            "variance_reduction": float(reduction),
+        }
+
+    def print_results(self) -> None:
+        """Print detailed simulation results to console."""
+        average, median, bust_rate, _ = self.calculate_statistics()
+
+        print("\n" + "=" * 50)
+        print("STRATEGY RESULTS")
+        print("=" * 50)
+        print(f"Initial Stake:              ${self.config.initial_stake:.2f}")
+        print(f"Games per Simulation:       {self.config.total_games}")
+        print(f"Win Chance:                 {self.config.win_chance * 100}%")
+        print(f"Payout Ratio:               {self.config.payout_ratio}:1")
+        if isinstance(self.strategy, HybridStrategy):
+            print(f"Conservative Bet Percent:   {self.strategy.bet_percent * 100}%")
+            print(f"Strategy Switch Point:      {self.strategy.strategy_switch_point} games")
+        else:
+            print(f"Strategy:                   {self.strategy}")
+        print("-" * 50)
+        print(f"Average Final Stake:        ${average:,.2f}")
+        print(f"Median Final Stake:         ${median:,.2f}")
+        if self.log_stakes is not None:
+            # Stakes over very long horizons only print meaningfully as logarithms
+            median_log_stake = float(partition_quantiles(self._partitioned_stakes(), [0.5])[0])
+            print(f"Median Log-Stake:           {median_log_stake:,.4f}")
+        if self.weights is not None and self.config.tilted_win_chance is not None:
+            print(f"Bankruptcy Rate:            {bust_rate:.3g}%")
+            print(f"Effective Sample Size:      {self.effective_sample_size():,.0f} "
+                  f"(tilted win chance {self.config.tilted_win_chance * 100}%)")
+        else:
+            print(f"Bankruptcy Rate:            {bust_rate:.2f}%")
+        has_control = self.config.antithetic or self.win_counts is not None
+        if self.weights is None and self.final_stakes is not None and has_control:
+            report = self.variance_report()
+            print("-" * 50)
+            print(f"Variance-Reduced Mean:      ${report['estimate']:,.2f} "
+                  f"(± {report['standard_error']:,.2f})")
+            print(f"Effective Sample Size:      {report['effective_sample_size']:,.0f}")
+            print(f"Variance Reduction:         {report['variance_reduction']:.2f}x")
+        print("=" * 50)
+
+    def plot_histogram(self, display_percentile: float = 0.95,
+                       path: Optional[str] = None) -> None:
+        """
+        Create a histogram of the simulation results.
+
+        A summary with pre-binned counts (BettingSimulator.run_summary with a
+        histogram) is rendered from its bins, at bin resolution.
+
+        matplotlib is only imported here. With a path, the figure is rendered
+        straight to the file without pyplot or a display, so batch jobs can
+        plot headless and in parallel; otherwise it is shown interactively.
+
+        Args:
+            display_percentile: Percentile to use for x-axis range (default 0.95)
+            path: File to save the plot to; the extension (.png, .svg or .pdf)
+                selects the format
+        """
+        plot_format = None
+        if path is not None:
+            plot_format = os.path.splitext(path)[1].lstrip(".").lower()
+            if plot_format not in PLOT_FORMATS:
+                raise ValueError(f"Plot file extension must be one of {PLOT_FORMATS}")
+
+        if self.log_stakes is not None:
+            print("\nCannot plot histogram: results are log-stakes.")
+            return
+
+        histogram = self.summary.histogram if self.summary is not None else None
+        if self.final_stakes is None and self.result_file is None and histogram is None:
+            print("\nCannot plot histogram: only summary statistics were kept.")
+            return
+
+        edges = None
+        log_scale = False
+
+        # Filter out bankruptcies for cleaner visualization
+        if self.final_stakes is None and histogram is not None:
+            # Render the counts accumulated during the simulation, up to the
+            # bin holding the display percentile of winning stakes
+            cumulative = histogram.underflow + np.cumsum(histogram.counts)
+            winning_count = cumulative[-1] + histogram.overflow
+            if winning_count == 0:
+                print("\nCannot plot histogram: all simulations went bust.")
+                return
+            shown = min(int(np.searchsorted(cumulative, display_percentile * winning_count)) + 1,
+                        len(histogram.counts))
+            edges = histogram.edges[:shown + 1]
+            frequencies = histogram.counts[:shown]
+            winning_stakes = edges[:-1]
+            log_scale = histogram.log_scale
+        elif self.final_stakes is None:
+            # Bin the file block by block; busts sit at the bottom of the distribution
+            if self.summary.bust_count == self.summary.count:
+                print("\nCannot plot histogram: all simulations went bust.")
+                return
+            bust_fraction = self.summary.bust_count / self.summary.count
+            max_range = self.summary.quantile(bust_fraction + (1 - bust_fraction) * display_percentile)
+            edges = np.linspace(0, max_range, 101)
+            frequencies = np.zeros(100)
+            for block in self.result_file.iter_blocks(self.block_size):
+                frequencies += fused_statistics(block, edges).bin_counts
+            winning_stakes = edges[:-1]
+        elif self._weighted_samples()[1] is None:
+            # Bin the winning stakes in one fused pass, without a filtered copy
+            fused = self._fused_statistics()
+            if fused.bust_count == fused.count:
+                print("\nCannot plot histogram: all simulations went bust.")
+                return
+            bust_fraction = fused.bust_count / fused.count
+            max_range = float(self.quantiles([bust_fraction + (1 - bust_fraction) * display_percentile])[0])
+            edges = np.linspace(0, max_range, 101)
+            frequencies = fused_statistics(self._weighted_samples()[0], edges).bin_counts
+            winning_stakes = edges[:-1]
+        else:
+            stakes, weights = self._weighted_samples()
+            winning = stakes > 0
+            winning_stakes = stakes[winning]
+            # Weighted results are shown as expected frequencies over num_simulations runs
+            frequencies = weights[winning] * (self.config.num_simulations / weights.sum())
+
+        if len(winning_stakes) == 0:
+            print("\nCannot plot histogram: all simulations went bust.")
+            return
+
+        print(f"\nGenerating histogram (showing {display_percentile * 100}% of results)...")
+
+        # Calculate display range
+        if edges is None:
+            max_range = weighted_quantiles(winning_stakes, frequencies, [display_percentile])[0]
+            edges = np.linspace(0, max_range, 101)
+
+        # Calculate statistics for display
+        average, median, bust_rate, _ = self.calculate_statistics()
+
+        # Create the histogram; a bare Figure renders with Agg and never needs a display
+        if path is None:
+            import matplotlib.pyplot as plt
+            figure = plt.figure(figsize=(12, 7))
+        else:
+            from matplotlib.figure import Figure
+            figure = Figure(figsize=(12, 7))
+        axes = figure.add_subplot()
+        axes.hist(winning_stakes, bins=edges, weights=frequencies,
+                  edgecolor='black', alpha=0.7)
+        if log_scale:
+            axes.set_xscale("log")
+
+        axes.set_title(f"Distribution of Final Stakes ({self.config.num_simulations} simulations, excluding bankruptcies)",
+                       fontsize=14, fontweight='bold')
+        axes.set_xlabel("Final Stake ($)", fontsize=12)
+        axes.set_ylabel("Frequency", fontsize=12)
+
+        # Add summary statistics box
+        if isinstance(self.strategy, HybridStrategy):
+            strategy_text = (f"Conservative Bet: {self.strategy.bet_percent * 100}%\n"
+                             f"Strategy Switch: {self.strategy.strategy_switch_point} games\n")
+        else:
+            strategy_text = f"Strategy: {self.strategy}\n"
+        summary_text = (
+            f"Simulations: {self.config.num_simulations:,}\n"
+            f"Display Range: {display_percentile * 100}%\n"
+            f"Games per Simulation: {self.config.total_games}\n"
+            f"Win Chance: {self.config.win_chance * 100}%\n"
+            f"Payout Ratio: {self.config.payout_ratio}:1\n"
+            f"{strategy_text}"
+            f"{'─' * 25}\n"
+            f"Initial Stake: ${self.config.initial_stake:.0f}\n"
+            f"Bankruptcy Rate: {bust_rate:.1f}%\n"
+            f"Median: ${median:,.0f}\n"
+            f"Average: ${average:,.0f}"
+        )
+
+        axes.text(0.98, 0.98, summary_text,
+                  transform=axes.transAxes,
+                  verticalalignment='top',
+                  horizontalalignment='right',
+                  bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8),
+                  fontfamily='monospace',
+                  fontsize=9)
+
+        axes.grid(axis='y', alpha=0.3, linestyle='--')
+        figure.tight_layout()
+
+        if path is None:
+            plt.show()
+        else:
+            figure.savefig(path, format=plot_format)
+            print(f"Histogram saved to {path}.")
 
 
 def main() -> None:
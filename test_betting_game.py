@@ -0,0 +1,483 @@
+"""Regression checks for Betting_game; run with `python -m unittest`."""
+
+import contextlib
+import importlib.util
+import io
+import math
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from Betting_game import (BettingSimulator, FixedFractionStrategy, GameConfig,
+                          HybridStrategy, QuantizedResults, ResultCache, ResultFile,
+                          SimulationAnalyzer, StakeHistogram, StreamingStatistics, Strategy,
+                          fused_statistics)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HAS_NUMBA = importlib.util.find_spec("numba") is not None
+
+
+class ProcessPoolTest(unittest.TestCase):
+    """Process pools must coexist with the parallel numba kernel."""
+
+    def test_jit_then_pool_exits(self):
+        # A forked pool after the parallel kernel used to hang at interpreter exit
+        script = (
+            "from Betting_game import BettingSimulator, GameConfig\n"
+            "from dataclasses import replace\n"
+            "config = GameConfig(num_simulations=30000, chunk_size=5000, engine='jit')\n"
+            "BettingSimulator(config, seed=1).run_simulations()\n"
+            "BettingSimulator(replace(config, engine='vectorized', workers=4), seed=1).run_simulations()\n"
+            "BettingSimulator(config, seed=1).run_simulations()\n"
+        )
+        result = subprocess.run([sys.executable, "-c", script], cwd=HERE,
+                                capture_output=True, timeout=300)
+        self.assertEqual(result.returncode, 0, result.stderr.decode())
+
+    @unittest.skipUnless(multiprocessing.get_context().get_start_method() == "fork",
+                         "workers are only forked where fork is the default")
+    def test_unguarded_script_can_use_workers(self):
+        # Without the jit engine, workers are forked and need no __main__ guard
+        script = (
+            f"import sys; sys.path.insert(0, {HERE!r})\n"
+            "from Betting_game import BettingSimulator, GameConfig\n"
+            "config = GameConfig(num_simulations=20000, chunk_size=5000, workers=2)\n"
+            "BettingSimulator(config, seed=1).run_simulations()\n"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "unguarded.py")
+            with open(path, "w") as f:
+                f.write(script)
+            result = subprocess.run([sys.executable, path], capture_output=True, timeout=300)
+        self.assertEqual(result.returncode, 0, result.stderr.decode())
+
+    def test_import_skips_numba(self):
+        script = "import sys, Betting_game; sys.exit('numba' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", script], cwd=HERE, timeout=60)
+        self.assertEqual(result.returncode, 0)
+
+
+def quietly(function, *args, **kwargs):
+    """Call function without its progress messages."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def quietly_output(function, *args, **kwargs):
+    """Call function and return what it printed."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        function(*args, **kwargs)
+    return output.getvalue()
+
+
+@dataclass(frozen=True)
+class StreakStrategy(Strategy):
+    """Bet big after a win and small otherwise; its state is the last outcome."""
+
+    def bet(self, stake, remaining, state=None):
+        return stake * (0.5 if state else 0.05)
+
+    def bet_array(self, stakes, remaining, state=None):
+        return stakes * np.where(state, 0.5, 0.05)
+
+    def initial_state(self, num_paths=None):
+        return False if num_paths is None else np.zeros(num_paths, dtype=bool)
+
+    def next_state(self, state, wins):
+        return wins
+
+
+class ExactEngineTest(unittest.TestCase):
+    """The exact engine must match closed-form results."""
+
+    def test_mean_matches_product_of_expected_factors(self):
+        # Each game multiplies the expected stake by p * (1 + f * (b - 1)) + (1 - p) * (1 - f)
+        config = GameConfig()
+        strategy = HybridStrategy.from_config(config)
+        expected = config.initial_stake
+        for remaining in range(config.total_games, 0, -1):
+            fraction = strategy.fraction(remaining)
+            expected *= (config.win_chance * (1 + fraction * (config.payout_ratio - 1))
+                         + (1 - config.win_chance) * (1 - fraction))
+
+        distribution = BettingSimulator(config).exact_distribution()
+        self.assertAlmostEqual(distribution.mean(), expected, delta=1e-9 * expected)
+        self.assertAlmostEqual(float(distribution.probabilities.sum()), 1.0, delta=1e-12)
+
+    def test_all_in_bust_probability(self):
+        # Betting everything k times survives only k straight wins
+        config = GameConfig(total_games=10)
+        strategy = FixedFractionStrategy(1.0)
+        distribution = BettingSimulator(config, strategy=strategy).exact_distribution()
+
+        survival = config.win_chance ** config.total_games
+        self.assertAlmostEqual(distribution.bust_probability, 1 - survival, delta=1e-12)
+        self.assertAlmostEqual(distribution.mean(),
+                               config.initial_stake * (config.win_chance * config.payout_ratio)
+                               ** config.total_games, delta=1e-9)
+
+    def test_last_game_all_in_bust_probability(self):
+        # With no conservative phase the hybrid strategy stakes everything on the last game
+        config = GameConfig(strategy_switch_point=0)
+        distribution = BettingSimulator(config).exact_distribution()
+        self.assertAlmostEqual(distribution.bust_probability, 1 - config.win_chance, delta=1e-12)
+
+
+class EngineEquivalenceTest(unittest.TestCase):
+    """Engines and execution layouts must agree on the results."""
+
+    config = GameConfig(num_simulations=20_000, chunk_size=5_000, strategy_switch_point=0)
+
+    def run_engine(self, seed=7, **changes):
+        simulator = BettingSimulator(replace(self.config, **changes), seed=seed)
+        return quietly(simulator.run_simulations)
+
+    def test_vectorized_matches_scalar_distribution(self):
+        vectorized = self.run_engine(engine="vectorized")
+        scalar = self.run_engine(engine="scalar", seed=8)
+
+        standard_error = math.sqrt(vectorized.var() / len(vectorized) + scalar.var() / len(scalar))
+        self.assertLess(abs(vectorized.mean() - scalar.mean()), 4 * standard_error)
+        bust_difference = np.mean(vectorized == 0) - np.mean(scalar == 0)
+        self.assertLess(abs(bust_difference), 4 * math.sqrt(2 * 0.25 / len(scalar)))
+
+    def test_stateful_strategy_matches_scalar_distribution(self):
+        # The bet must only see outcomes of earlier games, not the current one
+        config = GameConfig(total_games=20, win_chance=0.5, num_simulations=20_000)
+        results = [quietly(BettingSimulator(replace(config, engine=engine), seed=seed,
+                                            strategy=StreakStrategy()).run_simulations)
+                   for engine, seed in (("vectorized", 7), ("scalar", 8))]
+
+        standard_error = math.sqrt(sum(result.var() / len(result) for result in results))
+        self.assertLess(abs(results[0].mean() - results[1].mean()), 4 * standard_error)
+
+    @unittest.skipUnless(HAS_NUMBA, "numba is not installed")
+    def test_jit_matches_scalar_exactly(self):
+        np.testing.assert_array_equal(self.run_engine(engine="jit"), self.run_engine(engine="scalar"))
+
+    @unittest.skipUnless(HAS_NUMBA, "numba is not installed")
+    def test_jit_warns_when_falling_back(self):
+        config = replace(self.config, num_simulations=100, engine="jit")
+        simulator = BettingSimulator(config, seed=7, strategy=StreakStrategy())
+        with self.assertWarns(RuntimeWarning):
+            quietly(simulator.run_simulations)
+
+    def test_same_seed_reproduces(self):
+        np.testing.assert_array_equal(self.run_engine(), self.run_engine())
+        self.assertFalse(np.array_equal(self.run_engine(), self.run_engine(seed=8)))
+
+    def test_workers_match_serial_exactly(self):
+        np.testing.assert_array_equal(self.run_engine(workers=2), self.run_engine())
+
+    def test_chunks_match_full_run(self):
+        simulator = BettingSimulator(self.config, seed=7)
+        full = quietly(simulator.run_simulations)
+        for chunk_index in (0, simulator.num_chunks - 1):
+            start = chunk_index * self.config.chunk_size
+            np.testing.assert_array_equal(simulator.simulate_chunk(chunk_index),
+                                          full[start:start + self.config.chunk_size])
+
+    def test_importance_weights_average_to_one(self):
+        config = replace(self.config, tilted_win_chance=0.45)
+        _, weights = quietly(BettingSimulator(config, seed=7).run_importance_sampling)
+        standard_error = weights.std() / math.sqrt(len(weights))
+        self.assertLess(abs(weights.mean() - 1), 4 * standard_error)
+
+
+class ImportanceSamplingTest(unittest.TestCase):
+    """Likelihood-ratio weighting must estimate rare busts without bias."""
+
+    def test_rare_bust_rate_matches_exact(self):
+        # Only the final all-in game can bust, with probability 1 - win chance
+        config = GameConfig(total_games=10, win_chance=0.999, strategy_switch_point=0,
+                            tilted_win_chance=0.9, num_simulations=20_000, chunk_size=5_000)
+        simulator = BettingSimulator(config, seed=7)
+        stakes, weights = quietly(simulator.run_importance_sampling)
+        exact = simulator.exact_distribution()
+
+        average, _, bust_rate, _ = SimulationAnalyzer(config, stakes, weights=weights).calculate_statistics()
+        bust_terms = weights * (stakes == 0)
+        bust_error = bust_terms.std() / math.sqrt(len(stakes))
+        self.assertAlmostEqual(bust_rate / 100, bust_terms.mean(), delta=1e-15)
+        self.assertLess(abs(bust_rate / 100 - exact.bust_probability), 4 * bust_error)
+        self.assertLess(bust_error, 0.1 * exact.bust_probability)
+        mean_error = (weights * stakes).std() / math.sqrt(len(stakes))
+        self.assertLess(abs(average - exact.mean()), 4 * mean_error)
+
+
+class VarianceReportTest(unittest.TestCase):
+    """Variance-reduced means must stay unbiased and actually reduce variance."""
+
+    config = GameConfig(num_simulations=20_000, chunk_size=5_000)
+
+    def check_report(self, analyzer, stakes):
+        report = analyzer.variance_report()
+        exact_mean = BettingSimulator(self.config).exact_distribution().mean()
+        self.assertLess(abs(report["estimate"] - exact_mean), 4 * report["standard_error"])
+        self.assertGreater(report["variance_reduction"], 1)
+        self.assertAlmostEqual(report["naive_standard_error"],
+                               stakes.std(ddof=1) / math.sqrt(len(stakes)), delta=1e-9)
+        self.assertAlmostEqual(report["effective_sample_size"],
+                               len(stakes) * report["variance_reduction"], delta=1e-6)
+        self.assertIn("Variance Reduction", quietly_output(analyzer.print_results))
+
+    def test_antithetic_pairs(self):
+        config = replace(self.config, antithetic=True)
+        stakes = quietly(BettingSimulator(config, seed=7).run_simulations)
+        self.check_report(SimulationAnalyzer(config, stakes), stakes)
+
+    def test_win_count_control_variate(self):
+        stakes, win_counts = quietly(BettingSimulator(self.config, seed=7).run_simulations,
+                                     return_win_counts=True)
+        self.check_report(SimulationAnalyzer(self.config, stakes, win_counts=win_counts), stakes)
+
+
+class LogEngineTest(unittest.TestCase):
+    """The log engine must keep tiny stakes apart from busts."""
+
+    def test_short_horizon_matches_exact_distribution(self):
+        config = GameConfig(num_simulations=20_000, strategy_switch_point=0)
+        simulator = BettingSimulator(config, seed=7)
+        log_stakes = quietly(simulator.run_log_simulations)
+        exact = simulator.exact_distribution()
+
+        stakes = np.exp(log_stakes)
+        self.assertLess(abs(stakes.mean() - exact.mean()), 4 * stakes.std() / math.sqrt(len(stakes)))
+        analyzer = SimulationAnalyzer(config, log_stakes=log_stakes)
+        average, _, bust_rate, bust_count = analyzer.calculate_statistics()
+        self.assertAlmostEqual(average, stakes.mean(), delta=1e-9 * average)
+        self.assertEqual(bust_count, np.count_nonzero(stakes == 0))
+        self.assertLess(abs(bust_rate / 100 - exact.bust_probability), 0.02)
+
+    def test_long_horizon_underflow_is_not_bust(self):
+        config = GameConfig(total_games=100_000, strategy_switch_point=50_000, bet_percent=0.3,
+                            win_chance=0.5, num_simulations=50, engine="log")
+        simulator = BettingSimulator(config, seed=7)
+        log_stakes = quietly(simulator.run_log_simulations)
+        self.assertTrue(np.isfinite(log_stakes).all())
+
+        analyzer = SimulationAnalyzer(config, log_stakes=log_stakes)
+        self.assertEqual(analyzer.calculate_statistics()[3], 0)
+        self.assertIn("Median Log-Stake", quietly_output(analyzer.print_results))
+        with self.assertRaises(ValueError):
+            quietly(simulator.run_simulations)
+
+
+class FusedStatisticsTest(unittest.TestCase):
+    """The one-pass statistics must match separate NumPy reductions."""
+
+    def check_against_numpy(self, min_kernel_size):
+        values = np.random.default_rng(7).exponential(100.0, 10_001)
+        values[::7] = 0.0
+        edges = np.linspace(0.0, 250.0, 51)
+
+        fused = fused_statistics(values, edges, block_size=1000, min_kernel_size=min_kernel_size)
+        self.assertEqual(fused.count, len(values))
+        self.assertAlmostEqual(fused.total, values.sum(), delta=1e-9 * values.sum())
+        self.assertAlmostEqual(fused.total_squares, np.dot(values, values),
+                               delta=1e-9 * np.dot(values, values))
+        self.assertEqual(fused.bust_count, np.count_nonzero(values == 0))
+        self.assertEqual((fused.minimum, fused.maximum), (values.min(), values.max()))
+        np.testing.assert_array_equal(fused.bin_counts, np.histogram(values[values > 0], edges)[0])
+
+    def test_numpy_blocks_match(self):
+        self.check_against_numpy(min_kernel_size=1 << 30)
+
+    @unittest.skipUnless(HAS_NUMBA, "numba is not installed")
+    def test_kernel_matches(self):
+        self.check_against_numpy(min_kernel_size=0)
+
+    def test_last_edge_is_inclusive(self):
+        fused = fused_statistics(np.array([0.0, 1.0, 2.0, 3.0]), np.array([1.0, 2.0, 3.0]))
+        np.testing.assert_array_equal(fused.bin_counts, [1, 2])
+
+
+class QuantizedResultsTest(unittest.TestCase):
+    """Compressed results must stay within their relative precision."""
+
+    config = GameConfig(num_simulations=20_000, chunk_size=5_000)
+
+    def test_statistics_within_precision(self):
+        precision = 1e-3
+        simulator = BettingSimulator(self.config, seed=7)
+        full = SimulationAnalyzer(self.config, quietly(simulator.run_simulations))
+        compressed = quietly(simulator.run_simulations, quantize=precision)
+        quantized = SimulationAnalyzer(self.config, compressed)
+
+        self.assertLess(len(compressed.values), self.config.num_simulations)
+        full_average, _, full_bust_rate, _ = full.calculate_statistics()
+        average, median, bust_rate, _ = quantized.calculate_statistics()
+        self.assertLessEqual(abs(average - full_average), precision * full_average)
+        self.assertLessEqual(abs(median - full.quantiles([0.5])[0]), precision * median)
+        self.assertEqual(bust_rate, full_bust_rate)
+
+        levels = [0.01, 0.1, 0.9, 0.99]
+        np.testing.assert_allclose(quantized.quantiles(levels), full.quantiles(levels),
+                                   rtol=precision, atol=0)
+
+    def test_merge_keeps_every_simulation(self):
+        simulator = BettingSimulator(self.config, seed=7)
+        self.assertEqual(quietly(simulator.run_simulations, quantize=1e-3).num_simulations,
+                         self.config.num_simulations)
+
+        first, second = (QuantizedResults.from_stakes(simulator.simulate_chunk(index), 1e-3)
+                         for index in range(2))
+        merged = first.merge(second)
+        self.assertEqual(merged.num_simulations, 2 * self.config.chunk_size)
+        self.assertTrue(np.all(np.diff(merged.values) > 0))
+        with self.assertRaises(ValueError):
+            first.merge(QuantizedResults.from_stakes(simulator.simulate_chunk(2), 1e-2))
+
+
+class StakeHistogramTest(unittest.TestCase):
+    """Pre-binned histograms must account for every stake."""
+
+    def test_counters_and_inclusive_last_edge(self):
+        histogram = StakeHistogram([1.0, 2.0, 3.0])
+        histogram.update(np.array([0.0, 0.5, 1.0, 1.5, 2.0, 3.0, 3.5, 10.0]))
+
+        np.testing.assert_array_equal(histogram.counts, [2, 2])
+        self.assertEqual((histogram.bust_count, histogram.underflow, histogram.overflow), (1, 1, 2))
+        self.assertEqual(histogram.count, 8)
+
+    def test_run_summary_merges_chunks_and_workers(self):
+        config = GameConfig(num_simulations=20_000, chunk_size=5_000, strategy_switch_point=0)
+        bins = StakeHistogram.linear(high=300.0, bins=30, low=50.0)
+        stakes = quietly(BettingSimulator(config, seed=7).run_simulations)
+        serial = quietly(BettingSimulator(config, seed=7).run_summary, bins).histogram
+        parallel = quietly(BettingSimulator(replace(config, workers=2), seed=7).run_summary,
+                           bins).histogram
+
+        winning = stakes[stakes > 0]
+        np.testing.assert_array_equal(serial.counts, np.histogram(winning, bins.edges)[0])
+        self.assertEqual(serial.bust_count, np.count_nonzero(stakes == 0))
+        self.assertEqual(serial.underflow, np.count_nonzero(winning < 50.0))
+        self.assertEqual(serial.overflow, np.count_nonzero(winning > 300.0))
+        self.assertEqual(serial.count, config.num_simulations)
+        np.testing.assert_array_equal(parallel.counts, serial.counts)
+        self.assertEqual((parallel.bust_count, parallel.underflow, parallel.overflow),
+                         (serial.bust_count, serial.underflow, serial.overflow))
+        self.assertEqual(bins.count, 0)
+
+    def test_plot_from_bins_only(self):
+        config = GameConfig(num_simulations=5_000)
+        summary = quietly(BettingSimulator(config, seed=7).run_summary,
+                          StakeHistogram.logarithmic(1.0, 1e4, bins=40))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "histogram.png")
+            output = quietly_output(SimulationAnalyzer(config, summary=summary).plot_histogram,
+                                    path=path)
+            self.assertIn("Histogram saved", output)
+            self.assertGreater(os.path.getsize(path), 0)
+
+
+class ResultFileTest(unittest.TestCase):
+    """Result files must round-trip the run they record."""
+
+    def test_round_trip(self):
+        config = GameConfig(num_simulations=12_345, chunk_size=5_000, strategy_switch_point=0,
+                            result_dtype="float32")
+        simulator = BettingSimulator(config, seed=7)
+        stakes = quietly(simulator.run_simulations)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.bin")
+            quietly(simulator.run_to_file, path)
+            result_file = ResultFile.open(path)
+            self.assertEqual(result_file.config, config)
+            self.assertEqual(result_file.seed_sequence.entropy, simulator.seed_sequence.entropy)
+            self.assertEqual(result_file.seed_sequence.spawn_key, simulator.seed_sequence.spawn_key)
+            self.assertEqual(result_file.stakes.dtype, np.float32)
+            np.testing.assert_array_equal(result_file.stakes, stakes)
+
+            analyzer = SimulationAnalyzer.from_file(path, block_size=4096)
+            average, _, bust_rate, bust_count = analyzer.calculate_statistics()
+            self.assertAlmostEqual(average, stakes.mean(dtype=np.float64), delta=1e-6 * average)
+            self.assertEqual(bust_count, np.count_nonzero(stakes == 0))
+            del result_file, analyzer
+
+
+class AdaptiveRunTest(unittest.TestCase):
+    """Adaptive runs must stop at the requested precision or the budget."""
+
+    def run_adaptive(self, config, **targets):
+        simulator = BettingSimulator(config, seed=7)
+        return quietly(simulator.run_adaptive, max_simulations=200_000, batch_size=1000, **targets)
+
+    def test_mean_target(self):
+        result = self.run_adaptive(GameConfig(), mean_relative_halfwidth=0.05)
+        lower, upper = result.mean_interval
+        self.assertTrue(result.converged)
+        self.assertLess(result.num_simulations, 200_000)
+        self.assertLessEqual((upper - lower) / 2, 0.05 * result.summary.mean)
+        self.assertEqual(result.mean_interval, result.summary.mean_interval(result.confidence))
+
+    def test_bust_rate_target(self):
+        result = self.run_adaptive(GameConfig(strategy_switch_point=0), bust_rate_halfwidth=0.01)
+        lower, upper = result.bust_rate_interval
+        self.assertTrue(result.converged)
+        self.assertLessEqual((upper - lower) / 2, 0.01)
+        self.assertEqual(result.bust_rate_interval,
+                         result.summary.bust_rate_interval(result.confidence))
+        # A bust rate near one half needs about 10,000 paths for +/-1 point
+        self.assertGreater(result.num_simulations, 1000)
+
+    def test_budget_exhausted(self):
+        simulator = BettingSimulator(GameConfig(), seed=7)
+        result = quietly(simulator.run_adaptive, mean_relative_halfwidth=1e-6,
+                         max_simulations=3000, batch_size=1000)
+        self.assertFalse(result.converged)
+        self.assertEqual(result.num_simulations, 3000)
+        self.assertEqual(result.mean_interval, result.summary.mean_interval(result.confidence))
+
+    def test_target_required(self):
+        with self.assertRaises(ValueError):
+            BettingSimulator(GameConfig(), seed=7).run_adaptive()
+
+
+class ResultCacheTest(unittest.TestCase):
+    """The cache must respect its size budget."""
+
+    def test_oversized_entry_is_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_bytes=1000)
+            quietly(cache.put, "small", np.zeros(10))
+            quietly(cache.put, "large", np.zeros(1000))
+            self.assertIn("small", cache)
+            self.assertNotIn("large", cache)
+
+
+class AnalyzerTest(unittest.TestCase):
+    """Reporting must follow the results it is given."""
+
+    def test_summary_statistics_follow_updates(self):
+        summary = StreamingStatistics()
+        summary.update([1.0] * 3)
+        analyzer = SimulationAnalyzer(GameConfig(), summary=summary)
+        self.assertEqual(analyzer.calculate_statistics()[0], 1.0)
+
+        summary.update([100.0] * 10)
+        self.assertAlmostEqual(analyzer.calculate_statistics()[0], summary.mean)
+
+    def test_report_names_the_strategy(self):
+        config = GameConfig(num_simulations=100)
+        stakes = np.full(100, config.initial_stake)
+
+        hybrid_report = quietly_output(SimulationAnalyzer(config, stakes).print_results)
+        self.assertIn("Strategy Switch Point", hybrid_report)
+
+        strategy = FixedFractionStrategy(0.1)
+        fixed_report = quietly_output(SimulationAnalyzer(config, stakes, strategy=strategy).print_results)
+        self.assertNotIn("Strategy Switch Point", fixed_report)
+        self.assertIn(repr(strategy), fixed_report)
+
+
+if __name__ == "__main__":
+    unittest.main()